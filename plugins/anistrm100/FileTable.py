@@ -0,0 +1,74 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+
+class FileTable:
+    """
+    紧凑的文件列表：目录路径只保存一份（各段字符串驻留），文件名以 UTF-8 连续存放在一块缓冲区中，
+    每个文件只占文件名字节、一个偏移量和一个目录编号。
+    迭代、下标访问时仍然返回 (根目录, 子路径列表, 文件名)，与原来的元组列表用法一致
+    """
+
+    __slots__ = ('_dirs', '_dir_ids', '_dir_of', '_names', '_offsets')
+
+    def __init__(self, records: Iterable[Tuple[str, List[str], str]] = None):
+        # 目录编号 -> (根目录, 子路径...)
+        self._dirs: List[Tuple[str, ...]] = []
+        self._dir_ids: Dict[Tuple[str, ...], int] = {}
+        self._dir_of = array('I')
+        self._names = bytearray()
+        # 第 i 个文件名位于 _names[_offsets[i]:_offsets[i + 1]]
+        self._offsets = array('Q', [0])
+        if records:
+            self.extend(records)
+
+    def _dir_id(self, season: str, sub_paths: Iterable[str]) -> int:
+        key = (season, *sub_paths)
+        dir_id = self._dir_ids.get(key)
+        if dir_id is None:
+            key = tuple(sys.intern(part) for part in key)
+            dir_id = self._dir_ids[key] = len(self._dirs)
+            self._dirs.append(key)
+        return dir_id
+
+    def append(self, record: Tuple[str, List[str], str]):
+        season, sub_paths, file_name = record
+        self._dir_of.append(self._dir_id(season, sub_paths))
+        self._names += file_name.encode('utf-8')
+        self._offsets.append(len(self._names))
+
+    def extend(self, records: Iterable[Tuple[str, List[str], str]]):
+        for record in records:
+            self.append(record)
+
+    def _record(self, idx: int) -> Tuple[str, List[str], str]:
+        directory = self._dirs[self._dir_of[idx]]
+        file_name = self._names[self._offsets[idx]:self._offsets[idx + 1]].decode('utf-8')
+        return directory[0], list(directory[1:]), file_name
+
+    @property
+    def directories(self) -> int:
+        """
+        不同目录的数量
+        """
+        return len(self._dirs)
+
+    def __len__(self) -> int:
+        return len(self._dir_of)
+
+    def __iter__(self) -> Iterator[Tuple[str, List[str], str]]:
+        for idx in range(len(self._dir_of)):
+            yield self._record(idx)
+
+    def __getitem__(self, idx: Union[int, slice]):
+        if isinstance(idx, slice):
+            return [self._record(i) for i in range(*idx.indices(len(self._dir_of)))]
+        if idx < 0:
+            idx += len(self._dir_of)
+        if not 0 <= idx < len(self._dir_of):
+            raise IndexError('FileTable index out of range')
+        return self._record(idx)
+
+    def __bool__(self) -> bool:
+        return bool(self._dir_of)
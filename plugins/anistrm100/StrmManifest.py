@@ -0,0 +1,99 @@
+import hashlib
+import pathlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class StrmManifest:
+    """
+    记录生成过的 strm 文件的 SQLite 清单，以远端路径为主键，保存链接、strm 相对路径、首次/最近发现时间与内容哈希。
+    是否需要新建由清单决定，与目标目录中现有的文件无关，文件被移走后也不会重新生成。
+    各线程共用一个连接，写入在同一事务中累积，每 batch 条提交一次；read_only 时以只读方式打开已有的清单
+    """
+
+    def __init__(self, path: str, batch: int = 500, read_only: bool = False):
+        self._lock = threading.Lock()
+        self._batch = batch
+        self._pending = 0
+        if read_only:
+            self._conn = sqlite3.connect(f'{pathlib.Path(path).absolute().as_uri()}?mode=ro', uri=True,
+                                         check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            return
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS strm (
+                remote_path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                target TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_strm_target ON strm (target)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_strm_first_seen ON strm (first_seen)')
+        self._conn.commit()
+
+    @staticmethod
+    def hash(content: str) -> str:
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def find(self, remote_path: str, target: str = None) -> Optional[Dict[str, Any]]:
+        """
+        按远端路径查找，找不到时再按 strm 相对路径查找（RSS 与目录遍历得到的远端路径可能不同）
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM strm WHERE remote_path = ?', (remote_path,)).fetchone()
+            if row is None and target:
+                row = self._conn.execute('SELECT * FROM strm WHERE target = ? LIMIT 1', (target,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, remote_path: str, url: str, target: str, first_seen: str = None):
+        """
+        新增或更新一条记录，已有记录保留首次发现时间
+        """
+        now = self._now()
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO strm (remote_path, url, target, first_seen, last_seen, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (remote_path) DO UPDATE SET
+                    url = excluded.url, target = excluded.target,
+                    last_seen = excluded.last_seen, content_hash = excluded.content_hash''',
+                               (remote_path, url, target, first_seen or now, now, self.hash(url)))
+            self._pending += 1
+            if self._pending >= self._batch:
+                self._conn.commit()
+                self._pending = 0
+
+    def new_since(self, since: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        首次发现时间不早于 since（YYYY-MM-DD HH:MM:SS）的记录，按时间倒序
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM strm WHERE first_seen >= ? ORDER BY first_seen DESC LIMIT ?',
+                                      (since, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM strm').fetchone()[0]
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -1,42 +1,356 @@
+import hashlib
+import json
+import asyncio
+import contextvars
 import os
+import queue
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from io import BytesIO
 import re
-import shutil
-import tempfile
 from urllib.parse import urlparse, unquote
 import urllib.parse # Added this import
 
 import pytz
+import requests
+import shutil
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.utils.http import RequestUtils
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Set, Iterator, Iterable, Callable
 from app.log import logger
-import xml.dom.minidom
-from app.utils.dom import DomUtils
+from app.plugins.anistrm100.FileTable import FileTable
+from app.plugins.anistrm100.StrmManifest import StrmManifest
+import xml.etree.ElementTree as ET
+
+# 默认的目录镜像与 RSS 地址
+DEFAULT_MIRRORS = 'https://ani.v300.eu.org'
+DEFAULT_RSS_URLS = 'https://aniapi.v300.eu.org/ani-download.xml'
+
+# RSS 解析用到的正则，预先编译
+_WHITESPACE_RE = re.compile(r'\s+')
+_MP4_SUFFIX_RE = re.compile(r'\.mp4$')
+_LINK_SUFFIX_RE = re.compile(r'(\?d=true)?$')
+_SEASON_RE = re.compile(r'/(\d{4}-\d{1,2})/')
+_SEASON_DIR_RE = re.compile(r'^\d{4}-\d{1,2}$')
+# ANi 文件名：[ANi] 番名 - 集数 [1080P][Baha]...
+_ANI_NAME_RE = re.compile(r'^\[ANi\]\s*(.+?)\s+-\s+(\d+(?:\.\d+)?)(?:\s|\[|\.|$)')
+_INVALID_PATH_CHARS_RE = re.compile(r'[\\/:*?"<>|]')
+
+
+@lru_cache(maxsize=1024)
+def _clean_title(raw_title: str) -> Optional[str]:
+    """
+    把番名整理成可用作目录名的形式，按番名缓存，同一番剧只处理一次
+    """
+    return _INVALID_PATH_CHARS_RE.sub(' ', raw_title.strip()).strip(' .') or None
+
+
+def parse_ani_filename(file_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    从 ANi 文件名中解析出 (番名, 集数)，无法解析时返回 (None, None)。
+    每个文件名都要用预编译的正则匹配一次，番名的整理按番名缓存
+    """
+    match = _ANI_NAME_RE.match(file_name)
+    if not match:
+        return None, None
+    return _clean_title(match.group(1)), match.group(2)
+
+class CircuitOpenError(Exception):
+    """
+    熔断器打开时直接拒绝请求，retry_in 为最早可以再试的秒数
+    """
+
+    def __init__(self, message: str, retry_in: float = 0):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    按主机统计连续失败次数，超过阈值后在冷却时间内直接拒绝请求，冷却结束后放行试探
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: int = 60):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            return opened_at is None or time.monotonic() - opened_at >= self._cooldown
+
+    def retry_in(self, host: str) -> float:
+        """
+        距离冷却结束还有多少秒，未熔断时为 0
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 0
+            return max(0.0, self._cooldown - (time.monotonic() - opened_at))
+
+    def failures(self, host: str) -> int:
+        with self._lock:
+            return self._failures.get(host, 0)
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self._threshold:
+                if host not in self._opened_at:
+                    logger.warn(f"{host} 连续失败 {self._failures[host]} 次，暂停请求 {self._cooldown} 秒")
+                self._opened_at[host] = time.monotonic()
+
+
+class AdaptiveRateLimiter:
+    """
+    按主机的令牌桶限速器，进程内所有任务共享。
+    只在过载信号（429/503 或带 Retry-After）时成倍降低并遵守 Retry-After，其他 5xx 交给重试与熔断处理；
+    正常响应时按当前速率的比例回升，新一轮任务开始时恢复到最大速率
+    """
+
+    def __init__(self, max_rate: float = 10, min_rate: float = 0.5, burst: int = 5):
+        self._max_rate = max_rate
+        self._min_rate = min_rate
+        self._burst = burst
+        self._lock = threading.Lock()
+        # host -> [速率, 令牌数, 上次补充时间, 暂停截止时间]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def configure(self, max_rate: float):
+        with self._lock:
+            self._max_rate = max(self._min_rate, max_rate)
+            for bucket in self._buckets.values():
+                bucket[0] = min(bucket[0], self._max_rate)
+
+    def reset(self):
+        """
+        所有主机恢复到最大速率，保留尚未结束的 Retry-After 暂停
+        """
+        with self._lock:
+            for bucket in self._buckets.values():
+                bucket[0] = self._max_rate
+
+    def __bucket(self, host: str) -> List[float]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = [self._max_rate, self._burst, time.monotonic(), 0]
+        return bucket
+
+    def __reserve(self, host: str) -> float:
+        """
+        尝试取一个令牌，成功返回 0，否则返回需要等待的秒数
+        """
+        with self._lock:
+            bucket = self.__bucket(host)
+            now = time.monotonic()
+            if now < bucket[3]:
+                return bucket[3] - now
+            bucket[1] = min(self._burst, bucket[1] + (now - bucket[2]) * bucket[0])
+            bucket[2] = now
+            if bucket[1] >= 1:
+                bucket[1] -= 1
+                return 0
+            return (1 - bucket[1]) / bucket[0]
+
+    def acquire(self, host: str):
+        while True:
+            wait_time = self.__reserve(host)
+            if not wait_time:
+                return
+            time.sleep(wait_time)
+
+    async def acquire_async(self, host: str):
+        while True:
+            wait_time = self.__reserve(host)
+            if not wait_time:
+                return
+            await asyncio.sleep(wait_time)
+
+    def feedback(self, host: str, status_code: Optional[int], retry_after: str = None):
+        with self._lock:
+            bucket = self.__bucket(host)
+            delay = self.__parse_retry_after(retry_after)
+            if status_code in (429, 503) or (delay is not None and status_code and status_code >= 500):
+                bucket[0] = max(self._min_rate, bucket[0] * 0.5)
+                if delay:
+                    bucket[3] = max(bucket[3], time.monotonic() + delay)
+                logger.debug(f"{host} 返回 {status_code}，限速降至 {bucket[0]:.2f} 次/秒")
+            elif status_code and status_code < 400:
+                bucket[0] = min(self._max_rate, bucket[0] * 1.1 + 0.1)
+
+    @staticmethod
+    def __parse_retry_after(value: str) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(tz=pytz.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def rates(self) -> Dict[str, float]:
+        with self._lock:
+            return {host: round(bucket[0], 2) for host, bucket in self._buckets.items()}
 
-# 重试装饰器
+
+# 所有访问 ANi 的请求共用同一个限速器
+rate_limiter = AdaptiveRateLimiter()
+
+
+class RunStats:
+    """
+    单次运行的统计：各阶段耗时、按主机的请求数/失败数/累计耗时、重试次数、传输字节数、列出的目录数，
+    以及新建、跳过、失败的文件数和本次新建或改写的 strm 路径（结束时通知媒体服务器）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.started = time.monotonic()
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self.stages: Dict[str, float] = {}
+        self.files = {'created': 0, 'skipped': 0, 'failed': 0}
+        self.retries = 0
+        self.bytes = 0
+        self.directories = 0
+        self.snapshot_directories = 0
+        self.changed_paths: List[str] = []
+        self.dryrun = False
+
+    def record_request(self, host: str, status_code: Optional[int], latency: float, size: int = 0):
+        with self._lock:
+            stats = self.hosts.setdefault(host, {'requests': 0, 'errors': 0, 'latency': 0.0})
+            stats['requests'] += 1
+            stats['latency'] += latency
+            if status_code is None or status_code == 429 or status_code >= 500:
+                stats['errors'] += 1
+            self.bytes += size
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_directory(self):
+        with self._lock:
+            self.directories += 1
+
+    def record_file(self, result: str):
+        with self._lock:
+            self.files[result] += 1
+
+    def record_changed(self, path: str):
+        with self._lock:
+            self.changed_paths.append(path)
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @property
+    def requests(self) -> int:
+        with self._lock:
+            return sum(stats['requests'] for stats in self.hosts.values())
+
+    @property
+    def avg_latency(self) -> float:
+        """
+        平均请求耗时（秒）
+        """
+        with self._lock:
+            requests_count = sum(stats['requests'] for stats in self.hosts.values())
+            if not requests_count:
+                return 0.0
+            return sum(stats['latency'] for stats in self.hosts.values()) / requests_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'time': self.time,
+                'seconds': round(time.monotonic() - self.started, 1),
+                'stages': {stage: round(seconds, 2) for stage, seconds in self.stages.items()},
+                'requests': sum(stats['requests'] for stats in self.hosts.values()),
+                'errors': sum(stats['errors'] for stats in self.hosts.values()),
+                'retries': self.retries,
+                'bytes': self.bytes,
+                'hosts': {host: {'requests': stats['requests'],
+                                 'errors': stats['errors'],
+                                 'avg_latency': round(stats['latency'] / stats['requests'] * 1000)}
+                          for host, stats in self.hosts.items() if stats['requests']},
+                'directories': self.directories,
+                'snapshot_directories': self.snapshot_directories,
+                'files': dict(self.files)
+            }
+
+
+# 当前运行的统计，经 contextvars 带入线程池与事件循环，同时运行的任务各记各的
+_current_stats: contextvars.ContextVar[Optional[RunStats]] = contextvars.ContextVar('anistrm100_stats', default=None)
+
+
+def _record_request(host: str, status_code: Optional[int], latency: float, size: int = 0):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record_request(host, status_code, latency, size)
+
+
+# 重试装饰器，支持指数退避、随机抖动；wait_on 中的异常（带 retry_in）等待对应秒数后再试，不计入重试次数
 def retry(ExceptionToCheck: Any,
-          tries: int = 3, delay: int = 3, backoff: int = 1, logger: Any = None, ret: Any = None):
+          tries: int = 3, delay: float = 3, backoff: float = 1, logger: Any = None, ret: Any = None,
+          jitter: float = 0, max_delay: float = None, wait_on: Tuple[type, ...] = ()):
     def deco_retry(f):
         def f_retry(*args, **kwargs):
             mtries, mdelay = tries, delay
             while mtries > 0:
                 try:
                     return f(*args, **kwargs)
+                except wait_on as e:
+                    wait_time = getattr(e, 'retry_in', 0) + random.uniform(0, jitter)
+                    if logger:
+                        logger.debug(f"{e}，等待 {wait_time:.1f} 秒后重试")
+                    time.sleep(wait_time)
+                    continue
                 except ExceptionToCheck as e:
-                    msg = f"发生错误，将在 {mdelay} 秒后重试... 错误详情: {e}"
+                    mtries -= 1
+                    if mtries <= 0:
+                        break
+                    sleep = mdelay + random.uniform(0, jitter)
+                    msg = f"发生错误，将在 {sleep:.1f} 秒后重试... 错误详情: {e}"
                     if logger:
                         logger.warn(msg)
                     else:
                         print(msg)
-                    time.sleep(mdelay)
-                    mtries -= 1
-                    mdelay *= backoff
+                    stats = _current_stats.get()
+                    if stats is not None:
+                        stats.record_retry()
+                    time.sleep(sleep)
+                    mdelay = min(mdelay * backoff, max_delay) if max_delay else mdelay * backoff
             if logger:
                 logger.warn('多次重试后仍然失败。请检查文件夹是否存在或网络问题。')
             return ret
@@ -47,7 +361,7 @@ class ANiStrm100(_PluginBase):
     plugin_name = "ANiStrm100"
     plugin_desc = "自动获取当季所有番剧，免去下载，轻松拥有一个番剧媒体库"
     plugin_icon = "https://raw.githubusercontent.com/honue/MoviePilot-Plugins/main/icons/anistrm.png"
-    plugin_version = "3.2.1" # 版本更新，以体现新功能
+    plugin_version = "3.3.0" # 版本更新，以体现新功能
     plugin_author = "honue,GlowsSama"
     author_url = "https://github.com/GlowsSama"
     plugin_config_prefix = "anistrm100_"
@@ -61,8 +375,55 @@ class ANiStrm100(_PluginBase):
     _allseason = False
     _storageplace = None
     _overwrite = False # 新增：强制覆盖选项
+    _concurrency = 8 # 目录并发遍历数
+    _poolsize = 16 # 连接池大小
+    _timeout = 20 # 请求超时（秒）
+    _ratelimit = 10 # 每个主机每秒最多请求数
+    _engine = 'thread' # 目录遍历引擎：thread 或 asyncio
+    _async_concurrency = 100 # asyncio 引擎的并发请求数
+    _reconcile = False # 清理远端已不存在的 strm 文件
+    _reconcilemode = 'dryrun' # 清理方式：dryrun 仅报告、quarantine 移入隔离目录、delete 直接删除
+    _healthcheck = False # 定时检测 strm 链接是否失效
+    _healthcron = None
+    _layout = 'flat' # strm 目录结构：flat 季度/文件，series 季度/番名/文件
+    _mshost = None # 媒体服务器（Emby/Jellyfin）地址
+    _msapikey = None
+    _mspathmap = None # 本地路径:媒体服务器路径
+    _msbatch = 500 # 单次按文件刷新的最大数量，超过则按季度目录刷新
+    _mirrors: List[Tuple[str, str]] = [(DEFAULT_MIRRORS, DEFAULT_MIRRORS)] # (目录地址, 写入strm的地址，只用第一个)
+    _rss_urls: List[str] = [DEFAULT_RSS_URLS]
+    # 本次任务按延迟排好序的镜像，首次需要时探测
+    _mirror_order: Optional[List[str]] = None
+    _mirror_lock = threading.Lock()
+    _refreshsnapshot = False # 强制重新获取所有季度，忽略快照
+    _writers = 4 # strm 写入线程数
+    _write_queue_size = 256 # 每个写入线程的队列长度
+    _write_cost = 0.002 # 预演时估算的单个 strm 文件写入耗时（秒）
+    _history_size = 30 # 每种运行类型保留最近多少次的统计
+    _history_lock = threading.Lock()
+    _run_names = {'rss': '增量', 'fulladd': '当前季度', 'allseason': '补全历史', 'reconcile': '清理', 'health': '链接检测',
+                  'refresh': '刷新目录'}
+    _stage_names = {'listing': '获取列表', 'rss': 'RSS', 'write': '写入'}
 
     _scheduler: Optional[BackgroundScheduler] = None
+    # 同类任务同一时间只运行一个：heavy 为补全/全量/清理，rss 为增量，health 为链接检测
+    _run_locks: Dict[str, threading.Lock] = {'heavy': threading.Lock(), 'rss': threading.Lock(),
+                                             'health': threading.Lock()}
+    # 写入时按季度目录加锁，增量任务只会在正在写入的季度上等待补全任务
+    _season_locks: Dict[str, threading.Lock] = {}
+    _season_locks_guard = threading.Lock()
+    # 正在运行的任务数，会话、索引等在第一个任务开始时建立，最后一个任务结束时释放
+    _active_runs = 0
+    _active_runs_guard = threading.Lock()
+    # 单次任务内共享的连接池会话
+    _session: Optional[requests.Session] = None
+    # 单次任务内共享的熔断器
+    _breaker: Optional[CircuitBreaker] = None
+    # 本次任务中各季度目录下已存在的 strm 文件名，首次写入时才建立
+    _strm_index: Optional[Dict[str, Set[str]]] = None
+    # 本次任务中新建或改写的 strm 文件路径
+    _usemanifest = True # 按清单判断是否已生成过，而不是按目录中现有的文件
+    _manifest: Optional[StrmManifest] = None
 
     def init_plugin(self, config: dict = None):
         self.stop_service()
@@ -72,8 +433,29 @@ class ANiStrm100(_PluginBase):
             self._onlyonce = config.get("onlyonce")
             self._fulladd = config.get("fulladd")
             self._allseason = config.get("allseason")
+            self._refreshsnapshot = config.get("refreshsnapshot", False)
+            self._reconcile = config.get("reconcile", False)
+            self._reconcilemode = config.get("reconcilemode") or 'dryrun'
+            self._healthcheck = config.get("healthcheck", False)
+            self._healthcron = config.get("healthcron")
+            self._layout = config.get("layout") or 'flat'
+            self._usemanifest = config.get("usemanifest", True)
+            self._mshost = (config.get("mshost") or '').rstrip('/') or None
+            self._msapikey = config.get("msapikey")
+            self._mspathmap = config.get("mspathmap")
+            self._msbatch = self.__to_int(config.get("msbatch"), 500)
+            self._mirrors = self.__parse_mirrors(config.get("mirrors") or DEFAULT_MIRRORS)
+            self._rss_urls = [line.strip() for line in (config.get("rssurls") or DEFAULT_RSS_URLS).splitlines()
+                              if line.strip() and not line.strip().startswith('#')] or [DEFAULT_RSS_URLS]
             self._storageplace = config.get("storageplace")
             self._overwrite = config.get("overwrite", False) # 读取配置，默认为 False
+            self._concurrency = self.__to_int(config.get("concurrency"), 8)
+            self._poolsize = self.__to_int(config.get("poolsize"), 16)
+            self._timeout = self.__to_int(config.get("timeout"), 20)
+            self._ratelimit = self.__to_int(config.get("ratelimit"), 10)
+            rate_limiter.configure(max_rate=self._ratelimit)
+            self._engine = config.get("engine") or 'thread'
+            self._async_concurrency = self.__to_int(config.get("asyncconcurrency"), 100)
 
         if self._enabled or self._onlyonce:
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
@@ -81,27 +463,163 @@ class ANiStrm100(_PluginBase):
                 try:
                     self._scheduler.add_job(func=self.__task,
                                             trigger=CronTrigger.from_crontab(self._cron),
-                                            name="ANiStrm100文件创建")
+                                            name="ANiStrm100文件创建",
+                                            max_instances=1,
+                                            coalesce=True,
+                                            misfire_grace_time=300)
                     logger.info(f'ANi-Strm定时任务创建成功：{self._cron}')
                 except Exception as err:
                     logger.error(f"定时任务配置错误：{str(err)}")
 
+            if self._enabled and self._healthcheck and self._healthcron:
+                try:
+                    self._scheduler.add_job(func=self.__health_check_task,
+                                            trigger=CronTrigger.from_crontab(self._healthcron),
+                                            name="ANiStrm100链接检测",
+                                            max_instances=1,
+                                            coalesce=True,
+                                            misfire_grace_time=300)
+                    logger.info(f'ANi-Strm链接检测任务创建成功：{self._healthcron}')
+                except Exception as err:
+                    logger.error(f"链接检测定时任务配置错误：{str(err)}")
+
             if self._onlyonce:
                 logger.info(f"ANi-Strm服务启动，立即运行一次")
                 self._scheduler.add_job(func=self.__task,
-                                         args=[self._fulladd, self._allseason],
+                                         args=[self._fulladd, self._allseason, self._refreshsnapshot, self._reconcile],
                                          trigger='date',
                                          run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
                                          name="ANiStrm100文件创建")
                 self._onlyonce = False
                 self._fulladd = False
                 self._allseason = False
+                self._refreshsnapshot = False
+                self._reconcile = False
 
             self.__update_config()
             if self._scheduler.get_jobs():
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return max(1, int(value or default))
+        except (TypeError, ValueError):
+            return default
+
+    def __open_session(self):
+        """
+        为本次任务建立一个长连接会话，目录遍历与RSS请求共用连接池
+        """
+        self.__close_session()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._poolsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': settings.USER_AGENT, 'Connection': 'keep-alive'})
+        if settings.PROXY:
+            session.proxies.update(settings.PROXY)
+        self._session = session
+        self._breaker = CircuitBreaker()
+        self._mirror_order = None
+
+    def __close_session(self):
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    def __request_utils(self, headers: Dict[str, str] = None) -> RequestUtils:
+        if headers:
+            return RequestUtils(headers=headers, proxies=settings.PROXY, session=self._session, timeout=self._timeout)
+        return RequestUtils(ua=settings.USER_AGENT, proxies=settings.PROXY, session=self._session, timeout=self._timeout)
+
+    def __request(self, method: str, url: str, headers: Dict[str, str] = None) -> Optional[requests.Response]:
+        """
+        经过全局限速器发出请求，并把响应状态反馈给限速器
+        """
+        host = urlparse(url).netloc
+        rate_limiter.acquire(host)
+        request_utils = self.__request_utils(headers=headers)
+        start = time.monotonic()
+        if method == 'post':
+            rep = request_utils.post(url=url)
+        else:
+            rep = request_utils.get_res(url)
+        _record_request(host, rep.status_code if rep is not None else None, time.monotonic() - start,
+                        len(rep.content) if rep is not None else 0)
+        rate_limiter.feedback(host,
+                              rep.status_code if rep is not None else None,
+                              rep.headers.get('Retry-After') if rep is not None else None)
+        return rep
+
+    @staticmethod
+    def __parse_mirrors(text: str) -> List[Tuple[str, str]]:
+        """
+        每行一个镜像：目录地址|写入strm的地址，后者省略时与目录地址相同。
+        所有 strm 都写入第一行的地址，其余行的写入地址不生效
+        """
+        mirrors = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            base, _, strm_base = line.partition('|')
+            base = base.strip().rstrip('/')
+            mirrors.append((base, (strm_base.strip() or base).rstrip('/')))
+        return mirrors or [(DEFAULT_MIRRORS, DEFAULT_MIRRORS)]
+
+    def __rank_mirrors(self) -> List[str]:
+        """
+        探测各镜像根目录的响应延迟，可用的按延迟从低到高排序，不可用的排在最后
+        """
+        bases = [base for base, _ in self._mirrors]
+        if len(bases) == 1:
+            return bases
+        latencies: Dict[str, float] = {}
+        for base in bases:
+            start = time.monotonic()
+            rep = self.__request('post', f'{base}/')
+            if rep is not None and rep.status_code != 429 and rep.status_code < 500:
+                latencies[base] = round((time.monotonic() - start) * 1000)
+            else:
+                logger.warn(f"镜像 {base} 不可用")
+        order = sorted(latencies, key=latencies.get) + [base for base in bases if base not in latencies]
+        logger.info("镜像延迟：" + "，".join(f"{base} {latencies[base]} ms" if base in latencies else f"{base} 不可用"
+                                         for base in order))
+        stats = _current_stats.get()
+        # 预演不保存探测结果
+        if stats is None or not stats.dryrun:
+            self.save_data('mirrors', {'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                       'latencies': {base: latencies.get(base) for base in order}})
+        return order
+
+    def __select_mirror(self) -> str:
+        """
+        返回当前最快且状态正常的镜像：连续失败的镜像让位给下一个，熔断的镜像直接跳过；
+        全部熔断时抛出 CircuitOpenError，附带最早结束冷却的秒数
+        """
+        with self._mirror_lock:
+            if self._mirror_order is None:
+                self._mirror_order = self.__rank_mirrors()
+            order = self._mirror_order
+        if not self._breaker:
+            return order[0]
+        available = [base for base in order if self._breaker.allow(urlparse(base).netloc)]
+        if not available:
+            raise CircuitOpenError("所有镜像均已熔断",
+                                   retry_in=min(self._breaker.retry_in(urlparse(base).netloc) for base in order))
+        for base in available:
+            if self._breaker.failures(urlparse(base).netloc) < 2:
+                return base
+        return available[0]
+
+    def __strm_base(self) -> str:
+        """
+        写入 strm 的地址固定取第一个镜像的配置，不随探测延迟或故障切换变化，避免每次运行改写文件
+        """
+        return self._mirrors[0][1]
+
     def __get_ani_season(self, idx_month: int = None) -> str:
         current_date = datetime.now()
         current_year = current_date.year
@@ -117,189 +635,1233 @@ class ANiStrm100(_PluginBase):
     def __is_valid_file(self, name: str) -> bool:
         return 'ANi' in name
 
-    @retry(Exception, tries=3, logger=logger, ret=[])
-    def __traverse_directory(self, path_parts: List[str]) -> List[Tuple[str, List[str], str]]:
-        all_files = []
+    @retry(Exception, tries=4, delay=1, backoff=2, jitter=1, max_delay=30, logger=logger, ret=None,
+           wait_on=(CircuitOpenError,))
+    def __list_directory(self, path_parts: List[str]) -> Optional[List[dict]]:
+        """
+        列出单个远程目录的内容，失败时只重试这一次请求，最终失败返回 None；
+        所有镜像都熔断时等到冷却结束再试，不算作一次失败。429 交给限速器处理，不计入熔断
+        """
         current_path_str = "/".join(path_parts)
-        url = f'https://ani.v300.eu.org/{current_path_str}/'
+        url = f'{self.__select_mirror()}/{current_path_str}/'
+        host = urlparse(url).netloc
 
         logger.debug(f"正在遍历: {url}")
-        rep = RequestUtils(ua=settings.USER_AGENT, proxies=settings.PROXY).post(url=url)
-        # 增强健壮性：检查 rep 是否有效，以及是否有 .json() 方法
-        if rep and hasattr(rep, 'json'):
-            items = rep.json().get('files', [])
-        else:
-            logger.warn(f"无法获取有效的响应或响应无json方法，URL: {url}")
-            items = [] # 返回空列表以避免后续错误
+        rep = self.__request('post', url)
+        if rep is None or rep.status_code == 429 or rep.status_code >= 500:
+            if self._breaker and (rep is None or rep.status_code >= 500):
+                self._breaker.record_failure(host)
+            raise Exception(f"请求失败，状态码: {rep.status_code if rep is not None else '无响应'}，URL: {url}")
+        if self._breaker:
+            self._breaker.record_success(host)
+        # 目录不存在等情况视为空目录
+        if not rep:
+            logger.warn(f"无法获取有效的响应，状态码: {rep.status_code}，URL: {url}")
+            return []
+        return rep.json().get('files', [])
 
+    def __handle_listing(self, path_parts: List[str], items: Optional[List[dict]],
+                         outstanding: Dict[str, int], failed: Dict[str, List[str]]
+                         ) -> Tuple[List[Tuple[str, List[str], str]], List[List[str]], Optional[Tuple[str, bool]]]:
+        """
+        处理一个目录的列出结果，返回 (文件, 待遍历的子目录, 根目录完成信息)，两种遍历引擎共用
+        """
         base_folder = path_parts[0]
         sub_path_list = path_parts[1:]
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record_directory()
+        if items is None:
+            failed.setdefault(base_folder, []).append('/'.join(path_parts))
+            items = []
 
+        files = []
+        children = []
         for item in items:
             item_name = item.get('name')
             if not item_name: continue
 
             if self.__is_valid_file(item_name):
-                all_files.append((base_folder, sub_path_list, item_name))
+                files.append((base_folder, sub_path_list, item_name))
             elif '.' not in item_name:
-                all_files.extend(self.__traverse_directory(path_parts + [item_name]))
+                children.append(path_parts + [item_name])
+
+        outstanding[base_folder] += len(children) - 1
+        root_done = None
+        if not outstanding[base_folder]:
+            if base_folder in failed:
+                logger.warn(f"{base_folder} 下有 {len(failed[base_folder])} 个目录获取失败，"
+                            f"已保留其余结果: {', '.join(failed[base_folder][:5])}")
+            root_done = (base_folder, base_folder not in failed)
+        return files, children, root_done
+
+    def __iter_crawl(self, roots: List[List[str]],
+                     on_root_done: Callable[[str, bool], None] = None,
+                     engine: str = None) -> Iterator[Tuple[str, List[str], str]]:
+        """
+        使用有界线程池并发遍历多个根目录，同级目录并行列出，每列完一个目录就产出其中的文件；
+        某个根目录下的所有子目录都列完后回调 on_root_done(根目录, 是否完整)。
+        单个目录获取失败只影响该目录，其余结果照常产出。engine 为 asyncio 时改用协程引擎
+        """
+        if (engine or self._engine) == 'asyncio':
+            if httpx:
+                yield from self.__iter_crawl_async(roots, on_root_done=on_root_done)
+                return
+            logger.warn("未安装 httpx，无法使用 asyncio 遍历引擎，改用线程池")
 
-        return all_files
+        outstanding: Dict[str, int] = {}
+        failed: Dict[str, List[str]] = {}
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            pending = {}
+            for parts in roots:
+                pending[executor.submit(contextvars.copy_context().run, self.__list_directory, parts)] = parts
+                outstanding[parts[0]] = outstanding.get(parts[0], 0) + 1
+            stats = _current_stats.get()
+            while pending:
+                waited = time.monotonic()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                if stats is not None:
+                    stats.add_time('listing', time.monotonic() - waited)
+                for future in done:
+                    path_parts = pending.pop(future)
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        logger.warn(f"遍历目录 {'/'.join(path_parts)} 失败: {e}")
+                        items = None
 
-    def get_current_season_list(self) -> List[Tuple[str, List[str], str]]:
+                    files, children, root_done = self.__handle_listing(path_parts, items, outstanding, failed)
+                    for child_parts in children:
+                        pending[executor.submit(contextvars.copy_context().run, self.__list_directory, child_parts)] = child_parts
+                    yield from files
+                    if root_done and on_root_done:
+                        on_root_done(*root_done)
+
+    def __iter_crawl_async(self, roots: List[List[str]],
+                           on_root_done: Callable[[str, bool], None] = None) -> Iterator[Tuple[str, List[str], str]]:
+        """
+        在独立线程的事件循环中运行协程遍历，结果经有界队列交回调用方，调用方仍是普通生成器；
+        调用方提前停止迭代时通知事件循环取消剩余请求并关闭客户端
+        """
+        # 在进入事件循环前完成镜像探测
+        try:
+            self.__select_mirror()
+        except CircuitOpenError:
+            pass
+        out = queue.Queue(maxsize=1024)
+        stop = threading.Event()
+        finished = object()
+
+        def run():
+            try:
+                asyncio.run(self.__async_crawl(roots, out, stop))
+            except Exception as e:
+                logger.error(f"asyncio 遍历失败: {e}")
+            finally:
+                self.__put_unless_stopped(out, finished, stop)
+
+        threading.Thread(target=contextvars.copy_context().run, args=(run,), name="ANiStrm100-asyncio",
+                         daemon=True).start()
+        stats = _current_stats.get()
+        try:
+            while True:
+                waited = time.monotonic()
+                message = out.get()
+                if stats is not None:
+                    stats.add_time('listing', time.monotonic() - waited)
+                if message is finished:
+                    break
+                kind, payload = message
+                if kind == 'file':
+                    yield payload
+                elif on_root_done:
+                    on_root_done(*payload)
+        finally:
+            stop.set()
+
+    @staticmethod
+    def __put_unless_stopped(out: queue.Queue, message: Any, stop: threading.Event) -> bool:
+        """
+        队列满时等待调用方取走，调用方已停止时放弃，返回是否放入
+        """
+        while not stop.is_set():
+            try:
+                out.put(message, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def __async_crawl(self, roots: List[List[str]], out: queue.Queue, stop: threading.Event):
+        proxies = settings.PROXY or {}
+        proxy = proxies.get('https') or proxies.get('http')
+        client_kwargs = {
+            'headers': {'User-Agent': settings.USER_AGENT},
+            'timeout': self._timeout,
+            'limits': httpx.Limits(max_connections=self._async_concurrency,
+                                   max_keepalive_connections=self._async_concurrency),
+        }
+        try:
+            client = httpx.AsyncClient(proxy=proxy, **client_kwargs)
+        except TypeError:
+            # 旧版本 httpx 只支持 proxies 参数
+            client = httpx.AsyncClient(proxies=proxy, **client_kwargs)
+
+        semaphore = asyncio.Semaphore(self._async_concurrency)
+        outstanding: Dict[str, int] = {}
+        failed: Dict[str, List[str]] = {}
+        async with client:
+            pending = set()
+            for parts in roots:
+                pending.add(asyncio.create_task(self.__async_list_directory(client, semaphore, parts)))
+                outstanding[parts[0]] = outstanding.get(parts[0], 0) + 1
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path_parts, items = task.result()
+                    files, children, root_done = self.__handle_listing(path_parts, items, outstanding, failed)
+                    for child_parts in children:
+                        pending.add(asyncio.create_task(self.__async_list_directory(client, semaphore, child_parts)))
+                    # 队列满时阻塞事件循环，形成背压；调用方已停止时取消剩余请求
+                    messages = [('file', file_info) for file_info in files]
+                    if root_done:
+                        messages.append(('root', root_done))
+                    if not all(self.__put_unless_stopped(out, message, stop) for message in messages):
+                        for task in pending:
+                            task.cancel()
+                        await asyncio.gather(*pending, return_exceptions=True)
+                        logger.debug("调用方已停止迭代，取消剩余的目录请求")
+                        return
+
+    async def __async_list_directory(self, client: Any, semaphore: asyncio.Semaphore,
+                                     path_parts: List[str]) -> Tuple[List[str], Optional[List[dict]]]:
+        """
+        协程版的单目录列出，重试、熔断与限速策略与线程版一致
+        """
+        delay = 1
+        attempt = 0
+        while attempt < 4:
+            try:
+                url = f'{self.__select_mirror()}/{"/".join(path_parts)}/'
+            except CircuitOpenError as e:
+                # 熔断期间等待冷却结束，不计入重试次数
+                logger.debug(f"{e}，等待 {e.retry_in:.1f} 秒后重试 {'/'.join(path_parts)}")
+                await asyncio.sleep(e.retry_in + random.uniform(0, 1))
+                continue
+            host = urlparse(url).netloc
+            await rate_limiter.acquire_async(host)
+            rep = None
+            start = time.monotonic()
+            try:
+                async with semaphore:
+                    rep = await client.post(url)
+            except Exception as e:
+                logger.debug(f"请求 {url} 出错: {e}")
+            _record_request(host, rep.status_code if rep is not None else None, time.monotonic() - start,
+                            len(rep.content) if rep is not None else 0)
+            rate_limiter.feedback(host,
+                                  rep.status_code if rep is not None else None,
+                                  rep.headers.get('Retry-After') if rep is not None else None)
+            if rep is not None and rep.status_code != 429 and rep.status_code < 500:
+                if self._breaker:
+                    self._breaker.record_success(host)
+                if rep.status_code >= 400:
+                    logger.warn(f"无法获取有效的响应，状态码: {rep.status_code}，URL: {url}")
+                    return path_parts, []
+                try:
+                    return path_parts, rep.json().get('files', [])
+                except ValueError as e:
+                    logger.debug(f"解析 {url} 的响应失败: {e}")
+            elif self._breaker and (rep is None or rep.status_code >= 500):
+                self._breaker.record_failure(host)
+            attempt += 1
+            if attempt < 4:
+                stats = _current_stats.get()
+                if stats is not None:
+                    stats.record_retry()
+                await asyncio.sleep(delay + random.uniform(0, 1))
+                delay = min(delay * 2, 30)
+        logger.warn(f'多次重试后仍然失败: {"/".join(path_parts)}')
+        return path_parts, None
+
+    def __crawl(self, roots: List[List[str]], engine: str = None) -> FileTable:
+        return FileTable(self.__iter_crawl(roots, engine=engine))
+
+    def __traverse_directory(self, path_parts: List[str], engine: str = None) -> FileTable:
+        return self.__crawl([path_parts], engine=engine)
+
+    def get_current_season_list(self) -> FileTable:
         season = self.__get_ani_season()
         logger.info(f"正在获取当前季度的文件列表: {season}")
         return self.__traverse_directory([season])
 
-    @retry(Exception, tries=3, logger=logger, ret=[])
-    def get_latest_list(self) -> List:
-        addr = 'https://aniapi.v300.eu.org/ani-download.xml'
-        logger.info(f"正在尝试从 RSS 源获取最新文件: {addr}")
-        ret = RequestUtils(ua=settings.USER_AGENT, proxies=settings.PROXY).get_res(addr)
-        if ret and hasattr(ret, 'text'):
-            dom_tree = xml.dom.minidom.parseString(ret.text)
-            items = dom_tree.documentElement.getElementsByTagName("item")
-            result = []
-            for item in items:
-                title = DomUtils.tag_value(item, "title", default="").strip()
-                link = DomUtils.tag_value(item, "link", default="")
-                
-                # 移除title中的多余空格和.mp4后缀
-                clean_title = re.sub(r'\s+', ' ', title)  # 合并多余空格
-                clean_title = re.sub(r'\.mp4$', '', clean_title)  # 移除.mp4后缀
-                
-                # 修复链接格式问题
-                if "?d=mp4" in link:
-                    link = link.replace("?d=mp4", ".mp4?d=true")
-                elif not link.endswith("?d=true"):
-                    link = re.sub(r'(\?d=true)?$', '.mp4?d=true', link)
-                
-                # 完整URL解码
-                decoded_link = unquote(link)
-                
-                # 提取文件名部分（不含参数）
-                parsed_url = urlparse(decoded_link)
-                file_name_from_link = os.path.basename(parsed_url.path)
-                
-                # 移除文件名的.mp4后缀
-                clean_file_name = re.sub(r'\.mp4$', '', file_name_from_link)
-                
-                # 更宽松的匹配：检查title是否在解码后的文件名中（忽略大小写和空格）
-                # 使用相似度匹配代替精确匹配
-                if clean_title.lower() in clean_file_name.lower():
-                    result.append({
-                        'season': re.search(r'/(\d{4}-\d{1,2})/', decoded_link).group(1),
-                        'path_parts': [],
-                        'title': title,
-                        'link': decoded_link
-                    })
-                else:
-                    # 记录不匹配的条目以便调试
-                    logger.debug(f"标题不匹配: '{clean_title}' vs '{clean_file_name}'")
-            logger.info(f"成功从 RSS 源获取到 {len(result)} 个项目。")
-            return result
-        else:
+    @retry(Exception, tries=3, backoff=2, jitter=1, logger=logger, ret=([], None))
+    def get_latest_list(self) -> Tuple[Iterator[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        返回 (RSS 条目, 新的高水位)。高水位中的最新条目在解析到第一个条目后才填入，
+        由调用方在全部条目写入成功后自行保存；RSS 未更新时高水位为 None
+        """
+        # 带上次的 ETag/Last-Modified 发送条件请求，未变化时只会返回 304
+        rss_state: Dict[str, Any] = self.get_data('rss_state') or {}
+        headers = {'User-Agent': settings.USER_AGENT}
+        if rss_state.get('etag'):
+            headers['If-None-Match'] = rss_state['etag']
+        if rss_state.get('last_modified'):
+            headers['If-Modified-Since'] = rss_state['last_modified']
+        for addr in self._rss_urls:
+            logger.info(f"正在尝试从 RSS 源获取最新文件: {addr}")
+            fetch_start = time.monotonic()
+            ret = self.__request('get', addr, headers=headers)
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.add_time('rss', time.monotonic() - fetch_start)
+            if ret is not None and ret.status_code == 304:
+                logger.info("RSS 源未更新，跳过处理。")
+                return [], None
+            if ret and hasattr(ret, 'content'):
+                new_state = {
+                    'etag': ret.headers.get('ETag'),
+                    'last_modified': ret.headers.get('Last-Modified'),
+                    'last_link': rss_state.get('last_link')
+                }
+                return self.__iter_rss_items(ret.content, new_state), new_state
             logger.warn(f"无法获取有效的RSS响应，URL: {addr}")
-            return []
+        raise Exception("所有 RSS 地址均不可用")
+
+    @staticmethod
+    def __parse_rss_item(title: str, link: str) -> Optional[Dict[str, Any]]:
+        title = title.strip()
+
+        # 移除title中的多余空格和.mp4后缀
+        clean_title = _WHITESPACE_RE.sub(' ', title)  # 合并多余空格
+        clean_title = _MP4_SUFFIX_RE.sub('', clean_title)  # 移除.mp4后缀
+
+        # 修复链接格式问题
+        if "?d=mp4" in link:
+            link = link.replace("?d=mp4", ".mp4?d=true")
+        elif not link.endswith("?d=true"):
+            link = _LINK_SUFFIX_RE.sub('.mp4?d=true', link)
+
+        # 完整URL解码
+        decoded_link = unquote(link)
+
+        # 提取文件名部分（不含参数）
+        parsed_url = urlparse(decoded_link)
+        file_name_from_link = os.path.basename(parsed_url.path)
+
+        # 移除文件名的.mp4后缀
+        clean_file_name = _MP4_SUFFIX_RE.sub('', file_name_from_link)
 
-    def get_all_season_list(self, start_year: int = 2019) -> List[Tuple[str, List[str], str]]:
+        # 更宽松的匹配：检查title是否在解码后的文件名中（忽略大小写）
+        if clean_title.lower() not in clean_file_name.lower():
+            # 记录不匹配的条目以便调试
+            logger.debug(f"标题不匹配: '{clean_title}' vs '{clean_file_name}'")
+            return None
+
+        season_match = _SEASON_RE.search(decoded_link)
+        if not season_match:
+            logger.debug(f"链接中没有季度信息，跳过: {decoded_link}")
+            return None
+
+        return {
+            'season': season_match.group(1),
+            'path_parts': [],
+            'title': title,
+            'link': decoded_link
+        }
+
+    def __iter_rss_items(self, content: bytes, state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        增量解析 RSS，逐个 <item> 产出结果，处理完的节点立即释放；遇到上次处理过的最新条目（state 中的 last_link）即停止。
+        产出第一个条目前把它记为 state 中新的 last_link，是否保存由调用方决定；解析出错时抛出异常
+        """
+        cnt = 0
+        last_link = state.get('last_link')
+        newest_link = None
+        # 只统计解析本身的耗时，不含调用方处理产出条目的时间
+        stats = _current_stats.get()
+        parse_start = time.monotonic()
+        try:
+            for _, elem in ET.iterparse(BytesIO(content), events=('end',)):
+                if elem.tag != 'item':
+                    continue
+                rss_info = self.__parse_rss_item(title=elem.findtext('title') or '',
+                                                 link=elem.findtext('link') or '')
+                elem.clear()
+                if not rss_info:
+                    continue
+                if last_link and rss_info['link'] == last_link:
+                    logger.debug("已到达上次处理过的条目，停止解析。")
+                    break
+                if newest_link is None:
+                    newest_link = state['last_link'] = rss_info['link']
+                cnt += 1
+                if stats is not None:
+                    stats.add_time('rss', time.monotonic() - parse_start)
+                yield rss_info
+                parse_start = time.monotonic()
+        except ET.ParseError as e:
+            # 内容不完整时抛出，让本次运行失败而不保存高水位，下次重新处理剩余条目
+            raise Exception(f"解析RSS内容失败: {e}") from e
+        if stats is not None:
+            stats.add_time('rss', time.monotonic() - parse_start)
+        logger.info(f"成功从 RSS 源获取到 {cnt} 个新项目。")
+
+    def __recent_seasons(self) -> List[str]:
+        """
+        当前季度与上一季度，这两个季度的目录仍可能更新，不使用快照
+        """
         now = datetime.now()
-        all_files = []
+        current_month = (now.month - 1) // 3 * 3 + 1
+        if current_month == 1:
+            previous = f'{now.year - 1}-10'
+        else:
+            previous = f'{now.year}-{current_month - 3}'
+        return [f'{now.year}-{current_month}', previous]
+
+    @staticmethod
+    def __season_closed_at(season: str) -> datetime:
+        """
+        季度不再属于最近两个季度的时间，即季度开始后的第六个月初；此后目录视为不再变化
+        """
+        year, month = map(int, season.split('-'))
+        month += 6
+        if month > 12:
+            year, month = year + 1, month - 12
+        return datetime(year, month, 1)
+
+    def __snapshot_path(self, season: str) -> str:
+        return os.path.join(self.get_data_path(), 'snapshots', f'{season}.json')
+
+    def __load_snapshot(self, season: str) -> Optional[FileTable]:
+        path = self.__snapshot_path(season)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            # 季度结束前保存的快照可能缺少之后新增的文件，不再使用
+            if datetime.strptime(snapshot['timestamp'], '%Y-%m-%d %H:%M:%S') < self.__season_closed_at(season):
+                logger.info(f"季度 {season} 的快照保存于季度结束前，将重新获取")
+                return None
+            return FileTable((season, sub_paths, file_name) for sub_paths, file_name in snapshot.get('files', []))
+        except Exception as e:
+            logger.warn(f"读取季度 {season} 的快照失败，将重新获取: {e}")
+            return None
+
+    def __save_snapshot(self, season: str, files: Iterable[Tuple[str, List[str], str]]):
+        entries = sorted([list(sub_paths), file_name] for _, sub_paths, file_name in files)
+        content_hash = hashlib.sha256(json.dumps(entries, ensure_ascii=False).encode('utf-8')).hexdigest()
+        path = self.__snapshot_path(season)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('hash') == content_hash:
+                        logger.debug(f"季度 {season} 的列表未变化")
+                        return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'season': season,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'hash': content_hash,
+                    'files': entries
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+            logger.info(f"已保存季度 {season} 的快照，共 {len(entries)} 个文件")
+        except Exception as e:
+            logger.warn(f"保存季度 {season} 的快照失败: {e}")
+
+    def iter_all_season_list(self, start_year: int = 2019, refresh: bool = False,
+                             skip_seasons: Set[str] = None,
+                             on_season_done: Callable[[str], None] = None,
+                             engine: str = None,
+                             save_snapshots: bool = True) -> Iterator[Tuple[str, List[str], str]]:
+        """
+        逐个产出所有季度及 'ANi' 目录的文件，快照中的季度先产出，其余边遍历边产出；
+        skip_seasons 中的季度直接跳过，每个季度的文件全部产出后回调 on_season_done。
+        save_snapshots 为 False 时只读取快照，不写入
+        """
+        skip_seasons = skip_seasons or set()
+        now = datetime.now()
+        recent_seasons = self.__recent_seasons()
+        roots = []
         for year in range(start_year, now.year + 1):
             for month in [1, 4, 7, 10]:
                 if year == now.year and month > now.month:
                     continue
                 season = f"{year}-{month}"
-                logger.info(f"正在获取季度 {season} 的文件列表")
-                try:
-                    season_files = self.__traverse_directory([season])
-                    if season_files:
-                        all_files.extend(season_files)
-                except Exception as e:
-                    logger.warn(f"获取季度 {season} 的番剧失败: {e}")
+                if season in skip_seasons:
+                    continue
+                if not refresh and season not in recent_seasons:
+                    snapshot_files = self.__load_snapshot(season)
+                    if snapshot_files is not None:
+                        logger.debug(f"季度 {season} 使用快照，共 {len(snapshot_files)} 个文件")
+                        stats = _current_stats.get()
+                        if stats is not None:
+                            stats.snapshot_directories += snapshot_files.directories
+                        yield from snapshot_files
+                        if on_season_done:
+                            on_season_done(season)
+                        continue
+                roots.append([season])
+        if 'ANi' not in skip_seasons:
+            roots.append(['ANi'])
+        if not roots:
+            return
 
-        logger.info("正在获取 'ANi' 根目录的文件列表")
-        try:
-            ani_files = self.__traverse_directory(['ANi'])
-            if ani_files:
-                all_files.extend(ani_files)
-        except Exception as e:
-            logger.warn(f"获取 'ANi' 目录的文件失败: {e}")
+        # 只缓存仍在遍历中的季度，季度遍历完成后立即写入快照并释放
+        season_files: Dict[str, FileTable] = {}
 
-        return all_files
+        def on_root_done(season: str, complete: bool):
+            files = season_files.pop(season, None)
+            # 有目录获取失败或结果为空的季度不写入快照，也不记为已完成，下次重新获取；
+            # 最近两个季度与 'ANi' 目录仍在更新，只有已结束的季度才写入快照
+            if complete and files:
+                if save_snapshots and season != 'ANi' and season not in recent_seasons:
+                    self.__save_snapshot(season, files)
+                if on_season_done:
+                    on_season_done(season)
+
+        logger.info(f"正在并发获取 {len(roots)} 个目录的文件列表，并发数: {self._concurrency}")
+        for file_info in self.__iter_crawl(roots, on_root_done=on_root_done, engine=engine):
+            if file_info[0] not in season_files:
+                season_files[file_info[0]] = FileTable()
+            season_files[file_info[0]].append(file_info)
+            yield file_info
+
+    def get_all_season_list(self, start_year: int = 2019, refresh: bool = False,
+                            engine: str = None) -> FileTable:
+        return FileTable(self.iter_all_season_list(start_year=start_year, refresh=refresh, engine=engine))
+
+    def __build_strm_index(self) -> Dict[str, Set[str]]:
+        """
+        任务开始时对存储目录做一次 scandir，建立各季度目录（及其下番剧目录）中已有 strm 文件名的索引，
+        键为相对存储目录的路径，如 2024-1 或 2024-1/番名
+        """
+        index: Dict[str, Set[str]] = {}
+        if not self._storageplace or not os.path.isdir(self._storageplace):
+            return index
+        with os.scandir(self._storageplace) as season_entries:
+            for season_entry in season_entries:
+                if not season_entry.is_dir():
+                    continue
+                season_files = index[season_entry.name] = set()
+                with os.scandir(season_entry.path) as file_entries:
+                    for entry in file_entries:
+                        if entry.name.endswith('.strm'):
+                            season_files.add(entry.name)
+                        elif entry.is_dir():
+                            with os.scandir(entry.path) as series_entries:
+                                index[f'{season_entry.name}/{entry.name}'] = {
+                                    series_entry.name for series_entry in series_entries
+                                    if series_entry.name.endswith('.strm')}
+        logger.debug(f"已建立strm索引，共 {len(index)} 个目录，{sum(len(v) for v in index.values())} 个文件")
+        return index
+
+    def __ensure_strm_index(self):
+        """
+        同时运行的任务共用一份索引，只在还没有时建立
+        """
+        with self._active_runs_guard:
+            if self._strm_index is None:
+                self._strm_index = self.__build_strm_index()
+
+    def __ensure_manifest(self):
+        """
+        同时运行的任务共用一个清单连接，真正需要读写时才打开，RSS 未更新的运行不会打开
+        """
+        with self._active_runs_guard:
+            if self._manifest is None:
+                self.__open_manifest()
+
+    def __target_dir(self, season: str, file_name: str) -> str:
+        """
+        strm 文件所在目录（相对存储目录），series 结构下按番名再分一级，无法解析番名的仍放在季度目录
+        """
+        if self._layout == 'series':
+            title, _ = parse_ani_filename(file_name)
+            if title:
+                return f'{season}/{title}'
+        return season
+
+    def __strm_url(self, file_name: str, season: str, sub_paths: List[str] = None, file_url: str = None) -> str:
+        """
+        strm 中写入的链接；RSS 条目的链接从季度目录起改写到同一写入地址下，与目录遍历生成的链接一致
+        """
+        if file_url:
+            path = urlparse(file_url).path
+            idx = path.find(f'/{season}/')
+            if idx < 0:
+                return file_url
+            return f'{self.__strm_base()}{path[idx:]}?d=true'
+        remote_path = "/".join([season] + (sub_paths or []) + [file_name])
+        return f'{self.__strm_base()}/{remote_path}?d=true'
+
+    def __season_lock(self, season: str) -> threading.Lock:
+        with self._season_locks_guard:
+            lock = self._season_locks.get(season)
+            if lock is None:
+                lock = self._season_locks[season] = threading.Lock()
+            return lock
 
-    # <<< 修改：新增 overwrite 参数，并根据其决定是否跳过文件存在检查 >>>
     def __touch_strm_file(self, file_name: str, season: str, sub_paths: List[str] = None, file_url: str = None, overwrite: bool = False) -> bool:
+        # 同一季度目录同一时间只有一个任务在写
+        with self.__season_lock(season):
+            return self.__write_strm_file(file_name=file_name, season=season, sub_paths=sub_paths,
+                                          file_url=file_url, overwrite=overwrite)
+
+    # <<< 修改：新增 overwrite 参数，并根据其决定是否跳过文件存在检查 >>>
+    def __write_strm_file(self, file_name: str, season: str, sub_paths: List[str] = None, file_url: str = None, overwrite: bool = False) -> bool:
         sub_paths = sub_paths or []
 
-        target_dir_path = os.path.join(self._storageplace, season)
-        os.makedirs(target_dir_path, exist_ok=True)
+        target_dir = self.__target_dir(season, file_name)
+        target_dir_path = os.path.join(self._storageplace, target_dir)
+        existing_files = self._strm_index.get(target_dir)
+        if existing_files is None:
+            # 索引中没有的目录才需要创建
+            os.makedirs(target_dir_path, exist_ok=True)
+            existing_files = self._strm_index[target_dir] = set()
 
         target_file_name = f'{file_name}.strm'
         target_file_path = os.path.join(target_dir_path, target_file_name)
+        target = f'{target_dir}/{target_file_name}'
+        remote_path = "/".join([season] + sub_paths + [file_name])
+        src_url = self.__strm_url(file_name=file_name, season=season, sub_paths=sub_paths, file_url=file_url)
+        stats = _current_stats.get()
+
+        # 清单中有记录说明生成过，即使文件已被移走也不再重建；没有记录时按目录中已有的文件判断。
+        # 记录的位置与本次计算的不同（如切换了目录结构）时按新位置重新判断，首次发现时间沿用记录
+        entry = self._manifest.find(remote_path, target) if self._manifest and self._usemanifest else None
+        first_seen = entry['first_seen'] if entry else None
+        if entry and entry['target'] != target:
+            logger.debug(f"{remote_path} 的strm位置由 {entry['target']} 变为 {target}")
+            entry = None
+        if entry:
+            exists, unchanged = True, entry['content_hash'] == StrmManifest.hash(src_url)
+        else:
+            exists, unchanged = target_file_name in existing_files, False
+            if exists and not first_seen:
+                # 清单建立前已有的文件按修改时间记为首次发现时间，避免整个媒体库都被当成新文件
+                try:
+                    mtime = os.path.getmtime(target_file_path)
+                    first_seen = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+                except OSError:
+                    pass
+            # 强制覆盖模式下，内容相同的文件无需重写
+            if exists and overwrite:
+                try:
+                    with open(target_file_path, 'r', encoding='utf-8') as file:
+                        unchanged = file.read().strip() == src_url
+                except OSError:
+                    pass
 
-        # 检查最终文件是否已存在，如果不是强制覆盖模式，则跳过
-        if not overwrite and os.path.exists(target_file_path):
-            logger.debug(f'{target_file_name} 文件已存在于最终目录，跳过创建。')
+        if exists and (not overwrite or unchanged):
+            logger.debug(f'{target_file_name} 已存在{"且内容未变化" if overwrite else ""}，跳过创建。')
+            if self._manifest:
+                self._manifest.record(remote_path, entry['url'] if entry and not overwrite else src_url,
+                                      target, first_seen=first_seen)
+            if stats is not None:
+                stats.record_file('skipped')
             return False
 
-        if file_url:
-            src_url = file_url
+        # 在目标目录内写入临时文件后原子重命名，避免跨文件系统复制
+        temp_file_path = os.path.join(target_dir_path, f'.{target_file_name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_file_path, 'w', encoding='utf-8') as file:
+                file.write(src_url)
+            os.replace(temp_file_path, target_file_path)
+            logger.info(f'成功创建 .strm 文件: {target_file_path}')
+            existing_files.add(target_file_name)
+            if self._manifest:
+                self._manifest.record(remote_path, src_url, target, first_seen=first_seen)
+            if stats is not None:
+                stats.record_file('created')
+                stats.record_changed(target_file_path)
+            return True
+        except Exception as e:
+            logger.error(f'创建 .strm 文件 {target_file_name} 失败: {e}')
+            if stats is not None:
+                stats.record_file('failed')
+            try:
+                os.remove(temp_file_path)
+            except OSError:
+                pass
+            return False
+
+    def __touch_strm_files(self, file_infos: Iterable[Dict[str, Any]], overwrite: bool = False,
+                           on_checkpoint: Callable[[str, int], None] = None) -> int:
+        """
+        边获取边写入：文件信息按季度目录分发到各写入线程的有界队列，同一目录始终由同一线程写入。
+        带 checkpoint 标记的条目表示该季度之前的文件都已写完，回调 on_checkpoint(季度, 已写入数)
+        """
+        queues = [queue.Queue(maxsize=self._write_queue_size) for _ in range(self._writers)]
+        counts = [0] * self._writers
+        stats = _current_stats.get()
+
+        def writer(idx: int):
+            while True:
+                file_info = queues[idx].get()
+                if file_info is None:
+                    break
+                if file_info.get('checkpoint'):
+                    if on_checkpoint:
+                        on_checkpoint(file_info['season'], sum(counts))
+                    continue
+                write_start = time.monotonic()
+                try:
+                    if self.__touch_strm_file(file_name=file_info['file_name'],
+                                              season=file_info['season'],
+                                              sub_paths=file_info.get('sub_paths'),
+                                              file_url=file_info.get('file_url'),
+                                              overwrite=overwrite):
+                        counts[idx] += 1
+                except Exception as e:
+                    logger.error(f"写入 {file_info['file_name']} 失败: {e}")
+                    if stats is not None:
+                        stats.record_file('failed')
+                if stats is not None:
+                    stats.add_time('write', time.monotonic() - write_start)
+
+        threads = []
+        try:
+            for file_info in file_infos:
+                if not threads:
+                    # 有文件需要写入时才建立索引并启动写入线程
+                    self.__ensure_strm_index()
+                    self.__ensure_manifest()
+                    threads = [threading.Thread(target=contextvars.copy_context().run, args=(writer, idx), daemon=True)
+                               for idx in range(self._writers)]
+                    for thread in threads:
+                        thread.start()
+                queues[hash(file_info['season']) % self._writers].put(file_info)
+        finally:
+            if threads:
+                for q in queues:
+                    q.put(None)
+                for thread in threads:
+                    thread.join()
+        return sum(counts)
+
+    def __load_checkpoint(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        读取未完成的补全进度，没有则新建
+        """
+        checkpoint: Dict[str, Any] = self.get_data('checkpoint') or {}
+        if checkpoint and not checkpoint.get('finished'):
+            logger.info(f"从断点继续补全历史番剧，已完成 {len(checkpoint.get('seasons', []))} 个目录，"
+                        f"已写入 {checkpoint.get('written', 0)} 个文件")
+            checkpoint['refresh'] = checkpoint.get('refresh') or refresh
+        else:
+            checkpoint = {
+                'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'refresh': refresh,
+                'seasons': [],
+                'written': 0,
+                'finished': False
+            }
+        checkpoint['base_written'] = checkpoint.get('written', 0)
+        self.save_data('checkpoint', checkpoint)
+        return checkpoint
+
+    def __make_checkpoint_saver(self, checkpoint: Dict[str, Any]) -> Callable[[str, int], None]:
+        lock = threading.Lock()
+
+        def save(season: str, written: int):
+            with lock:
+                checkpoint['seasons'].append(season)
+                checkpoint['written'] = checkpoint['base_written'] + written
+                checkpoint['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self.save_data('checkpoint', checkpoint)
+            logger.debug(f"已记录进度：{season} 完成")
+        return save
+
+    def __iter_with_checkpoints(self, checkpoint: Dict[str, Any]) -> Iterator[Any]:
+        """
+        在季度的最后一个文件之后插入 checkpoint 标记，写入线程处理到标记时该季度已全部写完
+        """
+        done_seasons = []
+        for file_info in self.iter_all_season_list(refresh=checkpoint.get('refresh'),
+                                                   skip_seasons=set(checkpoint.get('seasons', [])),
+                                                   on_season_done=done_seasons.append):
+            while done_seasons:
+                yield {'season': done_seasons.pop(0), 'checkpoint': True}
+            yield file_info
+        while done_seasons:
+            yield {'season': done_seasons.pop(0), 'checkpoint': True}
+
+    def __finish_checkpoint(self, checkpoint: Dict[str, Any]):
+        checkpoint['finished'] = True
+        checkpoint['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.save_data('checkpoint', checkpoint)
+
+    def __reconcile(self, mode: str = 'dryrun') -> Dict[str, Any]:
+        """
+        对比远端列表与本地 strm 索引，找出远端已不存在的文件，按 mode 仅报告、隔离或删除。
+        始终重新获取所有季度，不使用快照（快照可能已过时）；只处理本次完整获取到列表的季度，避免因请求失败误删。
+        完整季度下的所有本地目录都参与对比，远端已改名或下架的番剧目录整个视为多余，清理后删除空的番剧目录
+        """
+        logger.info(f"开始任务：清理远端已不存在的strm文件，模式: {mode}")
+        local_index = self.__build_strm_index()
+        expected: Dict[str, Set[str]] = {}
+        complete_seasons: Set[str] = set()
+        for season, _, file_name in self.iter_all_season_list(refresh=True,
+                                                               on_season_done=complete_seasons.add):
+            target_dir = self.__target_dir(season, file_name)
+            if target_dir in local_index:
+                expected.setdefault(target_dir, set()).add(f'{file_name}.strm')
+
+        orphans: Dict[str, List[str]] = {}
+        for target_dir, local_files in local_index.items():
+            if target_dir.split('/')[0] not in complete_seasons:
+                continue
+            stale = sorted(local_files - expected.get(target_dir, set()))
+            if stale:
+                orphans[target_dir] = stale
+
+        total = sum(len(files) for files in orphans.values())
+        quarantine_dir = os.path.join(self.get_data_path(), 'quarantine', datetime.now().strftime('%Y%m%d%H%M%S'))
+        removed = 0
+        if mode in ('quarantine', 'delete'):
+            for target_dir, files in orphans.items():
+                source_dir = os.path.join(self._storageplace, target_dir)
+                if mode == 'quarantine':
+                    os.makedirs(os.path.join(quarantine_dir, target_dir), exist_ok=True)
+                for file_name in files:
+                    try:
+                        if mode == 'quarantine':
+                            shutil.move(os.path.join(source_dir, file_name),
+                                        os.path.join(quarantine_dir, target_dir, file_name))
+                        else:
+                            os.remove(os.path.join(source_dir, file_name))
+                        removed += 1
+                    except OSError as e:
+                        logger.error(f"清理 {target_dir}/{file_name} 失败: {e}")
+                # 番剧目录清空后一并删除，季度目录保留；目录中还有其他文件（如刮削的图片）时保留
+                if '/' in target_dir:
+                    try:
+                        os.rmdir(source_dir)
+                        logger.info(f"已删除空目录 {target_dir}")
+                        with self._active_runs_guard:
+                            if self._strm_index is not None:
+                                self._strm_index.pop(target_dir, None)
+                    except OSError:
+                        pass
+
+        report = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'mode': mode,
+            'total': total,
+            'removed': removed,
+            'quarantine': quarantine_dir if mode == 'quarantine' and removed else None,
+            'orphans': orphans
+        }
+        self.save_data('reconcile_report', report)
+        for target_dir, files in orphans.items():
+            logger.info(f"{target_dir} 有 {len(files)} 个远端已不存在的文件: {', '.join(files[:5])}")
+        if mode == 'dryrun':
+            logger.info(f"清理预览完成，共 {total} 个文件待清理，未做任何改动。")
         else:
-            remote_path = "/".join([season] + sub_paths + [file_name])
-            src_url = f'https://ani.v300.eu.org/{remote_path}?d=true'
+            logger.info(f"清理完成，共 {total} 个文件待清理，已{'隔离' if mode == 'quarantine' else '删除'} {removed} 个。")
+        return report
 
+    def __refresh_path(self, path_parts: List[str]) -> Dict[str, Any]:
+        """
+        只获取并写入一个季度目录或其下的一个番剧目录
+        """
+        path = '/'.join(path_parts)
+        logger.info(f"开始任务：刷新目录 {path}")
+        complete = []
+        file_infos = ({'file_name': file_name, 'season': season, 'sub_paths': sub_paths}
+                      for season, sub_paths, file_name in self.__iter_crawl(
+                          [path_parts], on_root_done=lambda _, ok: complete.append(ok)))
+        cnt = self.__touch_strm_files(file_infos, overwrite=self._overwrite)
+        logger.info(f'刷新目录 {path} 完成。共创建了 {cnt} 个新的 .strm 文件。')
+        return {'path': path, 'complete': all(complete), 'created': cnt}
+
+    def __plan(self, mode: str = 'rss', refresh: bool = False) -> Dict[str, Any]:
+        """
+        预演一次任务：照常获取远端列表（快照只读不写，RSS 不更新高水位），与本地 strm 索引对比，
+        统计需要列出的目录、请求数以及将要新建、覆盖、跳过的文件，并按实测耗时估算完整运行的时间。
+        不写入任何文件，清单单独以只读方式打开
+        """
+        logger.info(f"开始预演任务，模式: {mode}")
+        stats = RunStats()
+        stats.dryrun = True
+        token = _current_stats.set(stats)
+        start = time.monotonic()
+        manifest = None
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_file_path = os.path.join(temp_dir, target_file_name)
-                with open(temp_file_path, 'w', encoding='utf-8') as file:
-                    file.write(src_url)
-                logger.debug(f'成功在临时目录创建 .strm 文件: {temp_file_path}')
+            local_index = self.__build_strm_index()
+            if self._usemanifest:
+                try:
+                    manifest = StrmManifest(os.path.join(self.get_data_path(), 'manifest.db'), read_only=True)
+                except Exception as e:
+                    logger.debug(f"没有可用的strm清单，只按目录中已有的文件对比: {e}")
+            if mode == 'allseason':
+                # 与补全任务一致：跳过未完成断点中已处理的季度
+                checkpoint: Dict[str, Any] = self.get_data('checkpoint') or {}
+                resume = bool(checkpoint) and not checkpoint.get('finished')
+                skip_seasons = set(checkpoint.get('seasons', [])) if resume else set()
+                refresh = refresh or (resume and bool(checkpoint.get('refresh')))
+                file_infos = ({'file_name': file_name, 'season': season, 'sub_paths': sub_paths}
+                              for season, sub_paths, file_name in self.iter_all_season_list(
+                                  refresh=refresh, skip_seasons=skip_seasons, save_snapshots=False))
+            elif mode == 'fulladd':
+                file_infos = ({'file_name': file_name, 'season': season, 'sub_paths': sub_paths}
+                              for season, sub_paths, file_name in self.__iter_crawl([[self.__get_ani_season()]]))
+            else:
+                file_infos = ({'file_name': rss_info['title'],
+                               'season': rss_info['season'],
+                               'sub_paths': rss_info['path_parts'],
+                               'file_url': rss_info['link']}
+                              for rss_info in self.get_latest_list()[0]
+                              if self.__is_valid_file(rss_info['title']))
 
-                # shutil.move 会自动处理目标文件已存在时的覆盖（如果是文件）
-                shutil.move(temp_file_path, target_file_path)
-                logger.info(f'成功将文件从临时目录移动到: {target_file_path}') # 修改为info级别，更明确地表示成功
+            seasons: Dict[str, Dict[str, int]] = {}
+            samples: List[str] = []
+            for file_info in file_infos:
+                target_dir = self.__target_dir(file_info['season'], file_info['file_name'])
+                target_file_name = f"{file_info['file_name']}.strm"
+                src_url = self.__strm_url(file_name=file_info['file_name'], season=file_info['season'],
+                                          sub_paths=file_info.get('sub_paths'), file_url=file_info.get('file_url'))
+                entry = None
+                if manifest:
+                    remote_path = '/'.join([file_info['season']] + (file_info.get('sub_paths') or [])
+                                           + [file_info['file_name']])
+                    entry = manifest.find(remote_path, f'{target_dir}/{target_file_name}')
+                action = 'create'
+                if entry and entry['target'] == f'{target_dir}/{target_file_name}':
+                    unchanged = entry['content_hash'] == StrmManifest.hash(src_url)
+                    action = 'overwrite' if self._overwrite and not unchanged else 'skip'
+                elif target_file_name in local_index.get(target_dir, ()):
+                    action = 'skip'
+                    if self._overwrite:
+                        try:
+                            with open(os.path.join(self._storageplace, target_dir, target_file_name),
+                                      'r', encoding='utf-8') as file:
+                                if file.read().strip() != src_url:
+                                    action = 'overwrite'
+                        except OSError:
+                            action = 'overwrite'
+                season_plan = seasons.setdefault(file_info['season'], {'create': 0, 'overwrite': 0, 'skip': 0})
+                season_plan[action] += 1
+                if action == 'create' and len(samples) < 20:
+                    samples.append(f'{target_dir}/{target_file_name}')
+        finally:
+            _current_stats.reset(token)
+            if manifest is not None:
+                manifest.close()
+        elapsed = time.monotonic() - start
 
-            return True
+        totals = {action: sum(season_plan[action] for season_plan in seasons.values())
+                  for action in ('create', 'overwrite', 'skip')}
+        writes = totals['create'] + totals['overwrite']
+        plan = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'mode': mode,
+            'refresh': refresh,
+            'directories': stats.directories,
+            'snapshot_directories': stats.snapshot_directories,
+            'requests': stats.requests,
+            'avg_latency': round(stats.avg_latency * 1000),
+            'files': sum(totals.values()),
+            **totals,
+            'seasons': seasons,
+            'samples': samples,
+            'elapsed': round(elapsed, 1),
+            # 列表获取按本次实测耗时计，写入按每个文件的估计耗时分摊到各写入线程
+            'estimated_seconds': round(elapsed + writes * self._write_cost / self._writers, 1)
+        }
+        logger.info(f"预演完成：列出 {plan['directories']} 个目录（另有 {plan['snapshot_directories']} 个使用快照），"
+                    f"请求 {plan['requests']} 次，平均耗时 {plan['avg_latency']} ms；"
+                    f"将新建 {totals['create']} 个、覆盖 {totals['overwrite']} 个、跳过 {totals['skip']} 个文件，"
+                    f"预计耗时 {plan['estimated_seconds']} 秒")
+        return plan
+
+    def __probe(self, url: str) -> Tuple[Optional[int], float]:
+        """
+        探测单个链接，先发 HEAD，不支持时改为只取 1 字节的 Range 请求，返回 (状态码, 耗时毫秒)
+        """
+        host = urlparse(url).netloc
+        rate_limiter.acquire(host)
+        session = self._session or requests
+        status_code = None
+        retry_after = None
+        start = time.monotonic()
+        try:
+            rep = session.head(url, allow_redirects=True, timeout=self._timeout)
+            if rep.status_code in (403, 405, 501):
+                rep = session.get(url, headers={'Range': 'bytes=0-0'}, allow_redirects=True,
+                                  timeout=self._timeout, stream=True)
+                rep.close()
+            status_code = rep.status_code
+            retry_after = rep.headers.get('Retry-After')
+        except requests.RequestException as e:
+            logger.debug(f"探测 {url} 失败: {e}")
+        latency = round((time.monotonic() - start) * 1000)
+        _record_request(host, status_code, latency / 1000)
+        rate_limiter.feedback(host, status_code, retry_after)
+        return status_code, latency
+
+    def __health_check(self) -> Dict[str, Any]:
+        """
+        并发探测存储目录下所有 strm 文件中的链接，记录每个文件的状态与耗时，
+        对已失效（404/410）的链接用最新的目录列表重新生成
+        """
+        logger.info("开始任务：检测strm链接是否失效。")
+        self.__ensure_strm_index()
+        self.__ensure_manifest()
+        targets: Dict[str, str] = {}
+        # 其他任务可能同时在写入，遍历索引的副本
+        for target_dir, file_names in list(self._strm_index.items()):
+            for file_name in list(file_names):
+                rel_path = f'{target_dir}/{file_name}'
+                try:
+                    with open(os.path.join(self._storageplace, target_dir, file_name), 'r', encoding='utf-8') as file:
+                        targets[rel_path] = file.read().strip()
+                except OSError as e:
+                    logger.warn(f"读取 {rel_path} 失败: {e}")
+
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            futures = {executor.submit(contextvars.copy_context().run, self.__probe, url): rel_path for rel_path, url in targets.items()}
+            for future in futures:
+                status_code, latency = future.result()
+                results[futures[future]] = {'status': status_code, 'latency': latency}
+
+        broken = {rel_path for rel_path, result in results.items()
+                  if result['status'] is None or (result['status'] >= 400 and result['status'] != 429)}
+        repaired = self.__repair_links({rel_path for rel_path in broken if results[rel_path]['status'] in (404, 410)})
+        for rel_path in repaired:
+            results[rel_path]['repaired'] = True
+
+        summary = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total': len(results),
+            'broken': len(broken),
+            'repaired': len(repaired),
+            'avg_latency': round(sum(r['latency'] for r in results.values()) / len(results)) if results else 0
+        }
+        try:
+            with open(os.path.join(self.get_data_path(), 'health.json'), 'w', encoding='utf-8') as f:
+                json.dump({**summary, 'files': results}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warn(f"保存链接检测结果失败: {e}")
+        self.save_data('health', summary)
+        logger.info(f"链接检测完成：共 {summary['total']} 个，失效 {summary['broken']} 个，已修复 {summary['repaired']} 个。")
+        return summary
+
+    def __repair_links(self, broken: Set[str]) -> Set[str]:
+        """
+        重新获取失效文件所在季度的列表，按文件名找到新的远端路径后重写 strm
+        """
+        if not broken:
+            return set()
+        seasons: Dict[str, Set[str]] = {}
+        for rel_path in broken:
+            seasons.setdefault(rel_path.split('/')[0], set()).add(rel_path)
+
+        repaired = set()
+        for season, path_parts, file_name in self.__iter_crawl([[season] for season in seasons]):
+            rel_path = f'{self.__target_dir(season, file_name)}/{file_name}.strm'
+            if rel_path not in seasons.get(season, set()):
+                continue
+            if self.__touch_strm_file(file_name=file_name, season=season, sub_paths=path_parts, overwrite=True):
+                repaired.add(rel_path)
+        return repaired
+
+    def __map_media_server_path(self, path: str) -> str:
+        if self._mspathmap and ':' in self._mspathmap:
+            local_path, server_path = self._mspathmap.split(':', 1)
+            if path.startswith(local_path):
+                return server_path + path[len(local_path):]
+        return path
+
+    def __post_media_updates(self, paths: List[str], update_type: str) -> bool:
+        updates = [{'Path': self.__map_media_server_path(path), 'UpdateType': update_type} for path in paths]
+        rep = RequestUtils(headers={'X-Emby-Token': self._msapikey, 'User-Agent': settings.USER_AGENT},
+                           content_type='application/json',
+                           timeout=self._timeout).post_res(f'{self._mshost}/Library/Media/Updated',
+                                                           json={'Updates': updates})
+        return rep is not None and rep.status_code < 400
+
+    def __notify_media_server(self, paths: List[str]):
+        """
+        把本次运行新建或改写的 strm 路径一次性提交给媒体服务器刷新；数量过多或提交失败时改为按季度目录刷新
+        """
+        if not paths or not self._mshost or not self._msapikey:
+            return
+        if len(paths) <= self._msbatch:
+            if self.__post_media_updates(paths, 'Created'):
+                logger.info(f"已通知媒体服务器刷新 {len(paths)} 个文件")
+                return
+            logger.warn("按文件通知媒体服务器失败，改为按季度目录刷新")
+        season_dirs = sorted({os.path.join(self._storageplace, os.path.relpath(path, self._storageplace).split(os.sep)[0])
+                              for path in paths})
+        if self.__post_media_updates(season_dirs, 'Modified'):
+            logger.info(f"已通知媒体服务器刷新 {len(season_dirs)} 个季度目录")
+        else:
+            logger.error("通知媒体服务器刷新失败")
+
+    def __open_manifest(self):
+        try:
+            self._manifest = StrmManifest(os.path.join(self.get_data_path(), 'manifest.db'))
         except Exception as e:
-            logger.error(f'创建或移动 .strm 文件 {target_file_name} 失败: {e}')
-            return False
+            logger.warn(f"打开strm清单失败，本次只按目录中已有的文件去重: {e}")
+            self._manifest = None
 
-    def __task(self, fulladd: bool = False, allseason: bool = False):
-        cnt = 0
+    def __close_manifest(self):
+        if self._manifest:
+            try:
+                self._manifest.close()
+            except Exception as e:
+                logger.warn(f"关闭strm清单失败: {e}")
+            self._manifest = None
+
+    def __begin_run(self):
+        with self._active_runs_guard:
+            if not self._active_runs:
+                self.__open_session()
+                rate_limiter.reset()
+                self._strm_index = None
+            self._active_runs += 1
 
+    def __end_run(self, changed_paths: List[str] = None, read_only: bool = False):
+        """
+        read_only 的运行（预演）只归还会话，不通知媒体服务器也不提交清单；
+        最后一个结束的运行负责关闭会话与清单
+        """
+        if changed_paths and not read_only:
+            self.__notify_media_server(changed_paths)
+        with self._active_runs_guard:
+            self._active_runs -= 1
+            if not self._active_runs:
+                self.__close_session()
+                self.__close_manifest()
+            elif self._manifest and not read_only:
+                self._manifest.commit()
+
+    def __save_run_stats(self, run_type: str, stats: RunStats, error: str = None):
+        """
+        记录本次运行的统计，每种运行类型各保留最近的若干次，频繁的增量任务不会挤掉补全、检测等记录；
+        没有出错、没有失败请求、也没有新建或失败文件的增量运行（如 RSS 未更新）只写日志，不记入历史
+        """
+        record = {'type': run_type, **stats.to_dict(), 'error': error}
+        noop = run_type == 'rss' and not error and not record['errors'] and not record['files']['created'] and not record['files']['failed']
+        if not noop:
+            with self._history_lock:
+                history: List[Dict[str, Any]] = self.get_data('history') or []
+                history.append(record)
+                counts: Dict[str, int] = {}
+                kept = []
+                for item in reversed(history):
+                    counts[item.get('type')] = counts.get(item.get('type'), 0) + 1
+                    if counts[item.get('type')] <= self._history_size:
+                        kept.append(item)
+                self.save_data('history', kept[::-1])
+        stages = '，'.join(f'{self._stage_names.get(stage, stage)} {seconds} 秒'
+                          for stage, seconds in record['stages'].items())
+        logger.info(f"本次{self._run_names.get(run_type, run_type)}运行耗时 {record['seconds']} 秒"
+                    f"{'（' + stages + '）' if stages else ''}；请求 {record['requests']} 次，失败 {record['errors']} 次，"
+                    f"重试 {record['retries']} 次，传输 {record['bytes']} 字节；文件新建 {record['files']['created']} 个，"
+                    f"跳过 {record['files']['skipped']} 个，失败 {record['files']['failed']} 个")
+
+    @contextmanager
+    def __tracked_run(self, run_type: str) -> Iterator[RunStats]:
+        """
+        一次运行的公共流程：共用会话与索引，收集统计，结束后通知媒体服务器并记录本次统计
+        """
+        self.__begin_run()
+        stats = RunStats()
+        token = _current_stats.set(stats)
+        error = None
+        try:
+            yield stats
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            _current_stats.reset(token)
+            self.__end_run(stats.changed_paths)
+            self.__save_run_stats(run_type, stats, error)
+
+    def __health_check_task(self):
+        run_lock = self._run_locks['health']
+        if not run_lock.acquire(blocking=False):
+            logger.warn("上一次链接检测仍在运行，本次跳过。")
+            return
+        try:
+            with self.__tracked_run('health'):
+                self.__health_check()
+        finally:
+            run_lock.release()
+
+    def __task(self, fulladd: bool = False, allseason: bool = False, refresh: bool = False,
+               reconcile: bool = False):
+        # 补全、全量和清理互斥；增量任务可以与它们同时运行
+        run_type = 'heavy' if fulladd or allseason or reconcile else 'rss'
+        run_lock = self._run_locks[run_type]
+        if not run_lock.acquire(blocking=False):
+            logger.warn(f"已有同类任务在运行，本次{'补全/清理' if run_type == 'heavy' else '增量'}任务跳过。")
+            return
+        try:
+            with self.__tracked_run('reconcile' if reconcile else 'allseason' if allseason
+                                    else 'fulladd' if fulladd else 'rss'):
+                if reconcile:
+                    self.__reconcile(mode=self._reconcilemode)
+                else:
+                    self.__run_task(fulladd=fulladd, allseason=allseason, refresh=refresh)
+        finally:
+            run_lock.release()
+
+    def __run_task(self, fulladd: bool = False, allseason: bool = False, refresh: bool = False):
         # 将 self._overwrite 传递给 __touch_strm_file
         overwrite_mode = self._overwrite
 
+        on_checkpoint = None
+        rss_state = None
         if allseason:
             logger.info("开始任务：为所有历史季度和'ANi'目录创建strm文件。")
-            file_list = self.get_all_season_list()
-            logger.info(f"处理所有历史内容，共找到 {len(file_list)} 个文件。")
-            for season, path_parts, file_name in file_list:
-                if self.__is_valid_file(file_name):
-                    if self.__touch_strm_file(file_name=file_name, season=season, sub_paths=path_parts, overwrite=overwrite_mode):
-                        cnt += 1
+            checkpoint = self.__load_checkpoint(refresh=refresh)
+            on_checkpoint = self.__make_checkpoint_saver(checkpoint)
+            file_list = self.__iter_with_checkpoints(checkpoint)
         elif fulladd:
             logger.info("开始任务：为当前季度的所有文件创建strm文件。")
-            file_list = self.get_current_season_list()
-            logger.info(f'处理当前季度，共找到 {len(file_list)} 个文件。')
-            for season, path_parts, file_name in file_list:
-                if self.__is_valid_file(file_name):
-                    if self.__touch_strm_file(file_name=file_name, season=season, sub_paths=path_parts, overwrite=overwrite_mode):
-                        cnt += 1
+            season = self.__get_ani_season()
+            logger.info(f"正在获取当前季度的文件列表: {season}")
+            file_list = self.__iter_crawl([[season]])
+        else:
+            file_list = None
+
+        if file_list is not None:
+            file_infos = (file_info if isinstance(file_info, dict) else
+                          {'file_name': file_info[2], 'season': file_info[0], 'sub_paths': file_info[1]}
+                          for file_info in file_list
+                          if isinstance(file_info, dict) or self.__is_valid_file(file_info[2]))
         else:
             logger.info("开始任务：从RSS源获取最新文件。")
-            rss_info_list = self.get_latest_list()
-            logger.info(f'处理RSS源，找到 {len(rss_info_list)} 个新项目。')
-            for rss_info in rss_info_list:
-                if self.__is_valid_file(rss_info['title']):
-                    if self.__touch_strm_file(file_name=rss_info['title'],
-                                              file_url=rss_info['link'],
-                                              season=rss_info['season'],
-                                              sub_paths=rss_info['path_parts'],
-                                              overwrite=overwrite_mode):
-                        cnt += 1
+            rss_info_list, rss_state = self.get_latest_list()
+            file_infos = ({'file_name': rss_info['title'],
+                           'season': rss_info['season'],
+                           'sub_paths': rss_info['path_parts'],
+                           'file_url': rss_info['link']}
+                          for rss_info in rss_info_list
+                          if self.__is_valid_file(rss_info['title']))
 
+        stats = _current_stats.get()
+        failed_before = stats.files['failed'] if stats is not None else 0
+        cnt = self.__touch_strm_files(file_infos, overwrite=overwrite_mode, on_checkpoint=on_checkpoint)
+        if allseason:
+            self.__finish_checkpoint(checkpoint)
+        if rss_state is not None:
+            # 所有条目都写入成功后才更新高水位，有失败时下次重新处理这些条目
+            failed = stats.files['failed'] - failed_before if stats is not None else 0
+            if failed:
+                logger.warn(f"有 {failed} 个文件写入失败，本次不更新 RSS 高水位。")
+            else:
+                self.save_data('rss_state', rss_state)
         logger.info(f'任务完成。共创建了 {cnt} 个新的 .strm 文件。')
 
     def get_state(self) -> bool:
@@ -309,7 +1871,89 @@ class ANiStrm100(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                'path': '/plan',
+                'endpoint': self.api_plan,
+                'methods': ['GET'],
+                'summary': '预演任务',
+                'description': '获取远端列表并与本地strm对比，返回将要列出的目录、请求数、新建/覆盖/跳过的文件及预计耗时，不写入任何文件。'
+                               'mode 可选 rss（增量）、fulladd（当前季度）、allseason（所有季度）'
+            },
+            {
+                'path': '/refresh',
+                'endpoint': self.api_refresh,
+                'methods': ['GET'],
+                'summary': '刷新单个目录',
+                'description': '只获取一个季度目录（如 2024-1）或其下的一个番剧目录（如 2024-1/番名）并生成strm，完成后返回结果'
+            },
+            {
+                'path': '/new',
+                'endpoint': self.api_new,
+                'methods': ['GET'],
+                'summary': '最近新增的文件',
+                'description': '从strm清单中查询最近 hours 小时内首次生成的文件，默认 24 小时'
+            }
+        ]
+
+    def api_new(self, apikey: str, hours: int = 24, limit: int = 1000) -> Dict[str, Any]:
+        if apikey != settings.API_TOKEN:
+            return {'success': False, 'message': 'API密钥错误'}
+        since = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+        # 单独打开一个连接查询，不影响正在运行的任务
+        manifest = None
+        try:
+            manifest = StrmManifest(os.path.join(self.get_data_path(), 'manifest.db'))
+            entries = manifest.new_since(since, limit=limit)
+        except Exception as e:
+            logger.error(f"查询strm清单失败: {e}")
+            return {'success': False, 'message': str(e)}
+        finally:
+            if manifest is not None:
+                manifest.close()
+        return {'success': True, 'data': {'since': since, 'count': len(entries), 'files': entries}}
+
+    def api_refresh(self, apikey: str, path: str) -> Dict[str, Any]:
+        if apikey != settings.API_TOKEN:
+            return {'success': False, 'message': 'API密钥错误'}
+        if not self._storageplace:
+            return {'success': False, 'message': '未配置Strm存储地址'}
+        path_parts = [part for part in (path or '').strip().split('/') if part]
+        if not path_parts or not (_SEASON_DIR_RE.match(path_parts[0]) or path_parts[0] == 'ANi') \
+                or any(part in ('.', '..') for part in path_parts):
+            return {'success': False, 'message': f'无效的目录: {path}，应为季度目录或其下的番剧目录，如 2024-1/番名'}
+        try:
+            with self.__tracked_run('refresh') as stats:
+                result = self.__refresh_path(path_parts)
+        except Exception as e:
+            logger.error(f"刷新目录 {path} 失败: {e}")
+            return {'success': False, 'message': str(e)}
+        record = stats.to_dict()
+        return {'success': result['complete'],
+                'message': None if result['complete'] else '部分目录获取失败，已写入其余文件',
+                'data': {**result,
+                         'files': record['files'],
+                         'directories': record['directories'],
+                         'requests': record['requests'],
+                         'seconds': record['seconds']}}
+
+    def api_plan(self, apikey: str, mode: str = 'rss', refresh: bool = False) -> Dict[str, Any]:
+        if apikey != settings.API_TOKEN:
+            return {'success': False, 'message': 'API密钥错误'}
+        if mode not in ('rss', 'fulladd', 'allseason'):
+            return {'success': False, 'message': f'不支持的模式: {mode}'}
+        if not self._storageplace:
+            return {'success': False, 'message': '未配置Strm存储地址'}
+        # 与正在运行的任务共用会话，结束时不通知媒体服务器、不提交清单
+        self.__begin_run()
+        try:
+            plan = self.__plan(mode=mode, refresh=refresh)
+        except Exception as e:
+            logger.error(f"预演任务失败: {e}")
+            return {'success': False, 'message': str(e)}
+        finally:
+            self.__end_run(read_only=True)
+        return {'success': True, 'data': plan}
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -335,7 +1979,61 @@ class ANiStrm100(_PluginBase):
                     {
                         'component': 'VRow',
                         'content': [
-                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSwitch', 'props': {'model': 'overwrite', 'label': '强制覆盖已存在的Strm文件'}}]} # 新增覆盖开关
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSwitch', 'props': {'model': 'overwrite', 'label': '强制覆盖已存在的Strm文件'}}]}, # 新增覆盖开关
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 3}, 'content': [{'component': 'VSwitch', 'props': {'model': 'refreshsnapshot', 'label': '补全历史时忽略快照'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 3}, 'content': [{'component': 'VTextField', 'props': {'model': 'concurrency', 'label': '目录遍历并发数', 'type': 'number', 'placeholder': '8'}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 4}, 'content': [{'component': 'VTextField', 'props': {'model': 'poolsize', 'label': '连接池大小', 'type': 'number', 'placeholder': '16'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 4}, 'content': [{'component': 'VTextField', 'props': {'model': 'timeout', 'label': '请求超时（秒）', 'type': 'number', 'placeholder': '20'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 4}, 'content': [{'component': 'VTextField', 'props': {'model': 'ratelimit', 'label': '每秒最多请求数', 'type': 'number', 'placeholder': '10'}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSelect', 'props': {'model': 'engine', 'label': '目录遍历引擎', 'items': [{'title': '线程池', 'value': 'thread'}, {'title': 'asyncio（需要 httpx）', 'value': 'asyncio'}]}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextField', 'props': {'model': 'asyncconcurrency', 'label': 'asyncio 并发请求数', 'type': 'number', 'placeholder': '100'}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSwitch', 'props': {'model': 'reconcile', 'label': '清理远端已不存在的Strm文件（随立即运行一次执行）'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSelect', 'props': {'model': 'reconcilemode', 'label': '清理方式', 'items': [{'title': '仅预览', 'value': 'dryrun'}, {'title': '移入隔离目录', 'value': 'quarantine'}, {'title': '直接删除', 'value': 'delete'}]}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSwitch', 'props': {'model': 'healthcheck', 'label': '定时检测Strm链接并修复'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextField', 'props': {'model': 'healthcron', 'label': '链接检测周期 (Cron)', 'placeholder': '例如: 0 4 * * 0'}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextarea', 'props': {'model': 'mirrors', 'label': '目录镜像', 'rows': 3, 'placeholder': '每行一个：目录地址|写入strm的地址（可省略，只有第一行的生效）', 'hint': '获取列表时按延迟排序，失效时自动切换；strm 固定写入第一行的地址', 'persistent-hint': True}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextarea', 'props': {'model': 'rssurls', 'label': 'RSS 地址', 'rows': 3, 'placeholder': '每行一个，按顺序尝试'}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSelect', 'props': {'model': 'layout', 'label': 'Strm目录结构', 'items': [{'title': '季度/文件', 'value': 'flat'}, {'title': '季度/番名/文件', 'value': 'series'}]}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VSwitch', 'props': {'model': 'usemanifest', 'label': '按清单去重', 'hint': '生成过的文件即使被移走也不再重建', 'persistent-hint': True}}]}
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 3}, 'content': [{'component': 'VTextField', 'props': {'model': 'mshost', 'label': '媒体服务器地址', 'placeholder': 'http://emby:8096'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 3}, 'content': [{'component': 'VTextField', 'props': {'model': 'msapikey', 'label': '媒体服务器API Key'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 4}, 'content': [{'component': 'VTextField', 'props': {'model': 'mspathmap', 'label': '路径映射', 'placeholder': '/downloads/strm:/media/strm'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 2}, 'content': [{'component': 'VTextField', 'props': {'model': 'msbatch', 'label': '按文件刷新上限', 'type': 'number', 'placeholder': '500'}}]}
                         ]
                     }
                 ]
@@ -345,9 +2043,28 @@ class ANiStrm100(_PluginBase):
             "onlyonce": False,
             "fulladd": False,
             "allseason": False,
+            "refreshsnapshot": False,
             "storageplace": "/downloads/strm",
             "cron": "*/20 22,23,0,1 * * *",
             "overwrite": False, # 默认不强制覆盖
+            "concurrency": 8,
+            "poolsize": 16,
+            "timeout": 20,
+            "ratelimit": 10,
+            "engine": "thread",
+            "asyncconcurrency": 100,
+            "reconcile": False,
+            "reconcilemode": "dryrun",
+            "healthcheck": False,
+            "healthcron": "0 4 * * 0",
+            "mirrors": DEFAULT_MIRRORS,
+            "rssurls": DEFAULT_RSS_URLS,
+            "layout": "flat",
+            "usemanifest": True,
+            "mshost": "",
+            "msapikey": "",
+            "mspathmap": "",
+            "msbatch": 500,
         }
 
     def __update_config(self):
@@ -357,12 +2074,108 @@ class ANiStrm100(_PluginBase):
             "enabled": self._enabled,
             "fulladd": self._fulladd,
             "allseason": self._allseason,
+            "refreshsnapshot": self._refreshsnapshot,
             "storageplace": self._storageplace,
             "overwrite": self._overwrite, # 保存覆盖选项
+            "concurrency": self._concurrency,
+            "poolsize": self._poolsize,
+            "timeout": self._timeout,
+            "ratelimit": self._ratelimit,
+            "engine": self._engine,
+            "asyncconcurrency": self._async_concurrency,
+            "reconcile": self._reconcile,
+            "reconcilemode": self._reconcilemode,
+            "healthcheck": self._healthcheck,
+            "healthcron": self._healthcron,
+            "mirrors": "\n".join(base if strm_base == base else f"{base}|{strm_base}" for base, strm_base in self._mirrors),
+            "rssurls": "\n".join(self._rss_urls),
+            "layout": self._layout,
+            "usemanifest": self._usemanifest,
+            "mshost": self._mshost,
+            "msapikey": self._msapikey,
+            "mspathmap": self._mspathmap,
+            "msbatch": self._msbatch,
         })
 
     def get_page(self) -> List[dict]:
-        pass
+        checkpoint: Dict[str, Any] = self.get_data('checkpoint') or {}
+        if not checkpoint:
+            text = '暂无补全历史番剧的记录'
+        else:
+            status = '已完成' if checkpoint.get('finished') else '进行中或已中断，下次补全时将从断点继续'
+            text = (f"补全历史番剧：{status}；开始于 {checkpoint.get('started')}，"
+                    f"最近更新 {checkpoint.get('updated', '-')}；"
+                    f"已完成 {len(checkpoint.get('seasons', []))} 个目录，已写入 {checkpoint.get('written', 0)} 个文件")
+        report: Dict[str, Any] = self.get_data('reconcile_report') or {}
+        if report:
+            action = {'dryrun': '预览', 'quarantine': '隔离', 'delete': '删除'}.get(report.get('mode'), report.get('mode'))
+            text += (f"\n最近一次清理（{action}）：{report.get('time')}，发现 {report.get('total', 0)} 个远端已不存在的文件，"
+                     f"已处理 {report.get('removed', 0)} 个")
+        health: Dict[str, Any] = self.get_data('health') or {}
+        if health:
+            text += (f"\n最近一次链接检测：{health.get('time')}，共 {health.get('total', 0)} 个，"
+                     f"失效 {health.get('broken', 0)} 个，已修复 {health.get('repaired', 0)} 个，"
+                     f"平均耗时 {health.get('avg_latency', 0)} ms")
+        mirrors: Dict[str, Any] = self.get_data('mirrors') or {}
+        if mirrors.get('latencies'):
+            text += f"\n最近一次镜像探测（{mirrors.get('time')}）：" + "，".join(
+                f"{base} {latency} ms" if latency is not None else f"{base} 不可用"
+                for base, latency in mirrors['latencies'].items())
+        rates = rate_limiter.rates()
+        if rates:
+            text += '\n当前限速：' + '，'.join(f'{host} {rate} 次/秒' for host, rate in rates.items())
+        page = [
+            {
+                'component': 'VCard',
+                'props': {'variant': 'tonal'},
+                'content': [
+                    {
+                        'component': 'VCardText',
+                        'text': text
+                    }
+                ]
+            }
+        ]
+
+        history: List[Dict[str, Any]] = self.get_data('history') or []
+        if not history:
+            return page
+        headers = ['时间', '类型', '耗时', '各阶段', '请求（失败/重试）', '流量', '新建/跳过/失败', '各主机平均延迟']
+        rows = []
+        for record in reversed(history):
+            files = record.get('files', {})
+            cells = [
+                record.get('time'),
+                self._run_names.get(record.get('type'), record.get('type')) + ('（出错）' if record.get('error') else ''),
+                f"{record.get('seconds', 0)} 秒",
+                '，'.join(f'{self._stage_names.get(stage, stage)} {seconds} 秒'
+                         for stage, seconds in record.get('stages', {}).items()) or '-',
+                f"{record.get('requests', 0)}（{record.get('errors', 0)}/{record.get('retries', 0)}）",
+                f"{record.get('bytes', 0) / 1024 / 1024:.2f} MB" if record.get('bytes', 0) >= 1024 * 1024
+                else f"{record.get('bytes', 0) / 1024:.1f} KB",
+                f"{files.get('created', 0)}/{files.get('skipped', 0)}/{files.get('failed', 0)}",
+                '，'.join(f"{host} {stats['avg_latency']} ms" for host, stats in record.get('hosts', {}).items()) or '-'
+            ]
+            rows.append({
+                'component': 'tr',
+                'content': [{'component': 'td', 'text': cell} for cell in cells]
+            })
+        page.append({
+            'component': 'VTable',
+            'props': {'hover': True},
+            'content': [
+                {
+                    'component': 'thead',
+                    'content': [{'component': 'th', 'props': {'class': 'text-start ps-4'}, 'text': header}
+                                for header in headers]
+                },
+                {
+                    'component': 'tbody',
+                    'content': rows
+                }
+            ]
+        })
+        return page
 
     def stop_service(self):
         try:
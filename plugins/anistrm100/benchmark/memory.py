@@ -0,0 +1,77 @@
+"""
+对比爬取结果的两种内存表示：原来的 (str, list, str) 元组列表与 FileTable。
+
+用法：python memory.py [--seasons 30] [--series 40] [--episodes 13]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FileTable import FileTable  # noqa: E402
+
+
+def synthetic_listing(path_parts, series, episodes):
+    """
+    模拟 ANi 目录接口返回的 JSON，每次都重新解码，保证字符串与真实爬取一样是新对象
+    """
+    if len(path_parts) == 1:
+        items = [{'name': f'番剧名称 {path_parts[0]} 第{i}部'} for i in range(series)]
+    else:
+        items = [{'name': f'[ANi] {path_parts[-1]} - {ep:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4'}
+                 for ep in range(1, episodes + 1)]
+    return json.loads(json.dumps({'files': items}))['files']
+
+
+def crawl(path_parts, series, episodes):
+    """
+    与插件原来的递归遍历一致：每层 path_parts + [name]，每个目录一份 sub_path_list
+    """
+    base_folder = path_parts[0]
+    sub_path_list = path_parts[1:]
+    for item in synthetic_listing(path_parts, series, episodes):
+        item_name = item['name']
+        if 'ANi' in item_name:
+            yield base_folder, sub_path_list, item_name
+        elif '.' not in item_name:
+            yield from crawl(path_parts + [item_name], series, episodes)
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=30)
+    parser.add_argument('--series', type=int, default=40)
+    parser.add_argument('--episodes', type=int, default=13)
+    args = parser.parse_args()
+
+    seasons = [[f'{2019 + i // 4}-{i % 4 * 3 + 1}'] for i in range(args.seasons)]
+
+    def build_tuples():
+        return [record for root in seasons for record in crawl(root, args.series, args.episodes)]
+
+    def build_table():
+        return FileTable(record for root in seasons for record in crawl(root, args.series, args.episodes))
+
+    tuples, tuples_bytes = measure(build_tuples)
+    table, table_bytes = measure(build_table)
+    assert list(table) == tuples
+
+    print(f'文件数: {len(tuples)}')
+    print(f'元组列表: {tuples_bytes / 1024 / 1024:.2f} MiB ({tuples_bytes / len(tuples):.0f} B/文件)')
+    print(f'FileTable: {table_bytes / 1024 / 1024:.2f} MiB ({table_bytes / len(tuples):.0f} B/文件)')
+    print(f'减少: {(1 - table_bytes / tuples_bytes) * 100:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
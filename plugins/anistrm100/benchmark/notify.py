@@ -0,0 +1,75 @@
+"""
+用本地模拟的 ANi 服务（server.py）检查任务结束后通知媒体服务器的请求：
+数量不超过 msbatch 时一次提交所有文件，超过或被拒绝时改为按季度目录刷新。
+
+需要在 MoviePilot 环境中运行，例如在 MoviePilot 根目录执行：
+python app/plugins/anistrm100/benchmark/notify.py [--rss-items 20]
+全部符合预期时退出码为 0。
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from throughput import BENCHMARK_DIR, ANiStrm100Benchmark, reset_plugin_data, server_stats
+
+
+def run_check(name: str, rss_items: int, msbatch: int, media_max_updates: int, expected: list) -> bool:
+    """
+    启动一个模拟服务，执行一次增量任务，对比收到的刷新请求：expected 为 (UpdateType, 条目数, 是否接受) 的列表
+    """
+    server = subprocess.Popen([sys.executable, os.path.join(BENCHMARK_DIR, 'server.py'),
+                               '--depth', '1', '--latency', '0', '--rss-items', str(rss_items),
+                               '--media-max-updates', str(media_max_updates)],
+                              stdout=subprocess.PIPE, text=True)
+    storage = tempfile.mkdtemp(prefix='anistrm100-notify-')
+    try:
+        base = server.stdout.readline().strip()
+        plugin = ANiStrm100Benchmark()
+        plugin.init_plugin({
+            'enabled': False,
+            'storageplace': storage,
+            'mirrors': base,
+            'rssurls': f'{base}/ani-download.xml',
+            'ratelimit': 1000,
+            'mshost': base,
+            'msapikey': 'benchmark',
+            'msbatch': msbatch
+        })
+        reset_plugin_data(plugin)
+        plugin._ANiStrm100__task()
+        received = [(payload['updates'][0]['UpdateType'] if payload['updates'] else None,
+                     len(payload['updates']), payload['accepted'])
+                    for payload in server_stats(base).get('media_updates', [])]
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(storage, ignore_errors=True)
+    ok = received == expected
+    print(f"{name:<10} {'通过' if ok else '失败'}  预期 {expected}  实际 {received}", flush=True)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ANiStrm100 媒体服务器通知检查')
+    parser.add_argument('--rss-items', type=int, default=20)
+    args = parser.parse_args()
+    items = args.rss_items
+    results = [
+        # 一次提交全部文件
+        run_check('batch', items, msbatch=items, media_max_updates=0,
+                  expected=[('Created', items, True)]),
+        # 超过 msbatch，直接按季度目录刷新
+        run_check('overflow', items, msbatch=items - 1, media_max_updates=0,
+                  expected=[('Modified', 1, True)]),
+        # 按文件提交被拒绝，改为按季度目录刷新
+        run_check('fallback', items, msbatch=items, media_max_updates=items - 1,
+                  expected=[('Created', items, False), ('Modified', 1, True)])
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
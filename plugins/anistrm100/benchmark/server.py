@@ -0,0 +1,172 @@
+"""
+本地模拟的 ANi 服务：按参数生成目录列表（POST /{季度}/{子目录}/）与 RSS（GET /ani-download.xml），
+可设置目录深度、每层子目录数、每个目录的文件数、响应延迟与错误率。
+同时模拟媒体服务器的 POST /Library/Media/Updated，记录收到的刷新请求，条目数超过 --media-max-updates 时返回 400。
+
+单独运行：python server.py [--port 8000] [--depth 2] [--fanout 40] [--files 13] [--latency 50] [--error-rate 0]
+启动后第一行输出监听地址；GET /__stats 返回请求计数与收到的媒体刷新请求，POST /__reset 清零。
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+from xml.sax.saxutils import escape
+
+_SEASONS = [f'{year}-{month}' for year in range(2019, 2031) for month in (1, 4, 7, 10)]
+
+
+def episode_name(title: str, episode: int) -> str:
+    return f'[ANi] {title} - {episode:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4'
+
+
+def listing(path_parts, depth: int, fanout: int, files: int):
+    """
+    生成目录内容：未到最深一层时是子目录，最深一层是剧集文件；季度目录下另有几个散落的文件
+    """
+    if not path_parts:
+        return [{'name': season, 'mimeType': 'application/vnd.google-apps.folder'} for season in _SEASONS]
+    items = []
+    if len(path_parts) < depth:
+        items += [{'name': f'{"Series" if len(path_parts) == 1 else "Part"} {i}',
+                   'mimeType': 'application/vnd.google-apps.folder'} for i in range(fanout)]
+    if len(path_parts) == depth or len(path_parts) == 1:
+        title = ' '.join(path_parts[1:]) or f'Top {path_parts[0]}'
+        count = files if len(path_parts) == depth else 2
+        items += [{'name': episode_name(title, ep), 'mimeType': 'video/mp4',
+                   'size': '734003200', 'modifiedTime': '2024-01-01T00:00:00.000Z'}
+                  for ep in range(1, count + 1)]
+    return items
+
+
+def rss(base: str, season: str, items: int) -> bytes:
+    entries = []
+    for i in range(items):
+        name = episode_name(f'Rss {i % 50}', i // 50 + 1)
+        entries.append(f'<item><title>{escape(name)}</title>'
+                       f'<link>{base}/{season}/{quote(name)}?d=true</link>'
+                       f'<pubDate>{formatdate(time.time() - i * 60, usegmt=True)}</pubDate></item>')
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>ANi</title>'
+            f'{"".join(entries)}</channel></rss>').encode('utf-8')
+
+
+def make_handler(args):
+    lock = threading.Lock()
+    stats = {'requests': 0, 'errors': 0, 'bytes': 0, 'media_updates': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *_):
+            pass
+
+        def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json',
+                  headers: dict = None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _simulate(self) -> bool:
+            """
+            模拟网络延迟与服务端错误，返回 False 表示本次请求以 500 结束
+            """
+            if args.latency:
+                time.sleep(random.uniform(0.5, 1.5) * args.latency / 1000)
+            failed = random.random() < args.error_rate
+            with lock:
+                stats['requests'] += 1
+                stats['errors'] += failed
+            if failed:
+                self._send(500, b'{}')
+            return not failed
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/__stats':
+                with lock:
+                    body = json.dumps(stats).encode('utf-8')
+                self._send(200, body)
+                return
+            if path != '/ani-download.xml':
+                self._send(404)
+                return
+            if not self._simulate():
+                return
+            etag = f'"{args.rss_items}-{args.season}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, headers={'ETag': etag})
+                return
+            body = rss(f'http://{self.headers.get("Host")}', args.season, args.rss_items)
+            with lock:
+                stats['bytes'] += len(body)
+            self._send(200, body, content_type='application/xml', headers={'ETag': etag})
+
+        def do_HEAD(self):
+            self._send(200, content_type='video/mp4')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            data = self.rfile.read(length) if length else b''
+            if self.path == '/__reset':
+                with lock:
+                    stats.update(requests=0, errors=0, bytes=0, media_updates=[])
+                self._send(200, b'{}')
+                return
+            if urlparse(self.path).path == '/Library/Media/Updated':
+                updates = json.loads(data or b'{}').get('Updates', [])
+                accepted = not args.media_max_updates or len(updates) <= args.media_max_updates
+                with lock:
+                    stats['media_updates'].append({'updates': updates, 'accepted': accepted})
+                self._send(204 if accepted else 400)
+                return
+            if not self._simulate():
+                return
+            path_parts = [part for part in unquote(urlparse(self.path).path).split('/') if part]
+            body = json.dumps({'files': listing(path_parts, args.depth, args.fanout, args.files)},
+                              ensure_ascii=False).encode('utf-8')
+            with lock:
+                stats['bytes'] += len(body)
+            self._send(200, body)
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='本地模拟的 ANi 目录与 RSS 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=2, help='季度目录以下的目录层数，1 表示文件直接位于季度目录')
+    parser.add_argument('--fanout', type=int, default=40, help='每层的子目录数')
+    parser.add_argument('--files', type=int, default=13, help='最深一层每个目录的文件数')
+    parser.add_argument('--latency', type=float, default=50, help='平均响应延迟（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='返回 500 的请求比例')
+    parser.add_argument('--rss-items', type=int, default=200, help='RSS 中的条目数')
+    parser.add_argument('--season', default='2024-1', help='RSS 条目所在的季度')
+    parser.add_argument('--media-max-updates', type=int, default=0,
+                        help='媒体刷新请求最多接受的条目数，超过时返回 400，0 表示不限制')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    server.daemon_threads = True
+    print(f'http://{args.host}:{server.server_port}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
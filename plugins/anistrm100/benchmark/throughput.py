@@ -0,0 +1,201 @@
+"""
+对本地模拟的 ANi 服务（server.py）运行插件的获取与写入流程，统计每秒请求数、总耗时、峰值内存（RSS）与每秒文件数。
+
+需要在 MoviePilot 环境中运行，插件位于 app/plugins/anistrm100 下，例如在 MoviePilot 根目录执行：
+python app/plugins/anistrm100/benchmark/throughput.py [--depth 2] [--fanout 40] [--files 13] [--latency 50]
+    [--error-rate 0] [--engine thread] [--concurrency 8] [--ratelimit 1000] [--scenarios current,all,rss,fulladd,allseason,task-rss]
+
+插件数据写入单独的 ANiStrm100Benchmark 目录，strm 写入临时目录，不影响正在使用的插件。
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import Request, urlopen
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# benchmark -> anistrm100 -> plugins -> app -> MoviePilot 根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(BENCHMARK_DIR)))))
+
+from app.plugins.anistrm100 import ANiStrm100  # noqa: E402
+
+SCENARIOS = ['current', 'all', 'rss', 'fulladd', 'allseason', 'task-rss']
+
+
+class ANiStrm100Benchmark(ANiStrm100):
+    """
+    插件数据按类名存放，子类与正在使用的插件互不影响
+    """
+    pass
+
+
+class RssSampler:
+    """
+    后台定时读取进程的常驻内存，记录期间的峰值；无法读取 /proc 时退回 getrusage 的历史峰值
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.peak = 0
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # macOS 以字节为单位，Linux 以 KB 为单位
+            return peak if sys.platform == 'darwin' else peak * 1024
+        except ImportError:
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def server_stats(base: str, reset: bool = False) -> dict:
+    if reset:
+        urlopen(Request(f'{base}/__reset', data=b'', method='POST'), timeout=10).read()
+        return {}
+    with urlopen(f'{base}/__stats', timeout=10) as rep:
+        return json.loads(rep.read())
+
+
+def count_strm(storage: str) -> int:
+    return sum(1 for _, _, files in os.walk(storage) for name in files if name.endswith('.strm'))
+
+
+def reset_plugin_data(plugin: ANiStrm100Benchmark):
+    """
+    清空清单、RSS 高水位和断点
+    """
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(os.path.join(plugin.get_data_path(), f'manifest.db{suffix}'))
+        except OSError:
+            pass
+    plugin.save_data('rss_state', {})
+    plugin.save_data('checkpoint', {})
+
+
+def run_scenario(plugin: ANiStrm100Benchmark, name: str, base: str, storage: str) -> dict:
+    # 每个场景都从空目录、空清单、空的 RSS 高水位和断点开始
+    shutil.rmtree(storage, ignore_errors=True)
+    os.makedirs(storage)
+    reset_plugin_data(plugin)
+    server_stats(base, reset=True)
+
+    with RssSampler() as sampler:
+        start = time.monotonic()
+        if name == 'current':
+            files = len(plugin.get_current_season_list())
+        elif name == 'all':
+            files = len(plugin.get_all_season_list(refresh=True))
+        elif name == 'rss':
+            files = len(list(plugin.get_latest_list()[0]))
+        else:
+            plugin._ANiStrm100__task(fulladd=name == 'fulladd', allseason=name == 'allseason',
+                                     refresh=name == 'allseason')
+            files = count_strm(storage)
+        elapsed = time.monotonic() - start
+
+    stats = server_stats(base)
+    return {
+        'scenario': name,
+        'seconds': round(elapsed, 3),
+        'requests': stats.get('requests', 0),
+        'errors': stats.get('errors', 0),
+        'requests_per_second': round(stats.get('requests', 0) / elapsed, 1) if elapsed else 0,
+        'files': files,
+        'files_per_second': round(files / elapsed, 1) if elapsed else 0,
+        'peak_rss_mb': round(sampler.peak / 1024 / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ANiStrm100 获取与写入性能测试')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--fanout', type=int, default=40)
+    parser.add_argument('--files', type=int, default=13)
+    parser.add_argument('--latency', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rss-items', type=int, default=200)
+    parser.add_argument('--engine', default='thread', choices=['thread', 'asyncio'])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--asyncconcurrency', type=int, default=100)
+    parser.add_argument('--ratelimit', type=int, default=1000, help='每个主机每秒最多请求数')
+    parser.add_argument('--layout', default='flat', choices=['flat', 'series'])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--json', dest='json_path', help='同时把结果写入该 JSON 文件')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'未知的场景: {", ".join(sorted(unknown))}，可选 {", ".join(SCENARIOS)}')
+
+    server = subprocess.Popen([sys.executable, os.path.join(BENCHMARK_DIR, 'server.py'),
+                               '--depth', str(args.depth), '--fanout', str(args.fanout),
+                               '--files', str(args.files), '--latency', str(args.latency),
+                               '--error-rate', str(args.error_rate), '--rss-items', str(args.rss_items)],
+                              stdout=subprocess.PIPE, text=True)
+    storage = tempfile.mkdtemp(prefix='anistrm100-benchmark-')
+    results = []
+    try:
+        base = server.stdout.readline().strip()
+        plugin = ANiStrm100Benchmark()
+        plugin.init_plugin({
+            'enabled': False,
+            'storageplace': storage,
+            'mirrors': base,
+            'rssurls': f'{base}/ani-download.xml',
+            'engine': args.engine,
+            'concurrency': args.concurrency,
+            'asyncconcurrency': args.asyncconcurrency,
+            'ratelimit': args.ratelimit,
+            'layout': args.layout
+        })
+        for name in scenarios:
+            result = run_scenario(plugin, name, base, storage)
+            results.append(result)
+            print(f"{name:<10} 耗时 {result['seconds']:>8.2f} s  请求 {result['requests']:>6}"
+                  f"（{result['requests_per_second']:>7.1f}/s，失败 {result['errors']}）  "
+                  f"文件 {result['files']:>7}（{result['files_per_second']:>8.1f}/s）  "
+                  f"峰值内存 {result['peak_rss_mb']:>6.1f} MiB", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(storage, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
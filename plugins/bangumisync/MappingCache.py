@@ -0,0 +1,99 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+
+class MappingCache:
+    """
+    标题与 TMDB / Bangumi 条目映射的持久化缓存，保存在 SQLite 中，重启后仍然有效。
+    每条记录有各自的过期时间，超过 maxsize 条时淘汰最久未使用的记录；
+    记录同时保存标题与 tmdb id，便于按番剧单独清除
+    """
+
+    def __init__(self, path: str, maxsize: int = 2000):
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS mapping (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                title TEXT,
+                tmdb_id INTEGER,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_mapping_title ON mapping (title)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_mapping_tmdb_id ON mapping (tmdb_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_mapping_accessed ON mapping (accessed)')
+        self._conn.commit()
+
+    @staticmethod
+    def _key(key: Tuple) -> str:
+        return json.dumps(list(key), ensure_ascii=False)
+
+    def get(self, namespace: str, key: Tuple) -> Tuple[bool, Any]:
+        """
+        返回 (是否命中, 值)，过期的记录视为未命中并删除
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, expires FROM mapping WHERE namespace = ? AND key = ?',
+                                     (namespace, self._key(key))).fetchone()
+            if row is None:
+                return False, None
+            if row[1] < now:
+                self._conn.execute('DELETE FROM mapping WHERE namespace = ? AND key = ?', (namespace, self._key(key)))
+                self._conn.commit()
+                return False, None
+            self._conn.execute('UPDATE mapping SET accessed = ? WHERE namespace = ? AND key = ?',
+                               (now, namespace, self._key(key)))
+            self._conn.commit()
+        return True, json.loads(row[0])
+
+    def set(self, namespace: str, key: Tuple, value: Any, ttl: float,
+            title: str = None, tmdb_id: Optional[int] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO mapping (namespace, key, value, title, tmdb_id, expires, accessed) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (namespace, self._key(key), json.dumps(value, ensure_ascii=False),
+                                title, tmdb_id, now + ttl, now))
+            # 超出容量时先清掉过期的，再按最久未使用淘汰
+            if self._conn.execute('SELECT COUNT(*) FROM mapping').fetchone()[0] > self._maxsize:
+                self._conn.execute('DELETE FROM mapping WHERE expires < ?', (now,))
+                self._conn.execute('DELETE FROM mapping WHERE rowid IN (SELECT rowid FROM mapping ORDER BY accessed '
+                                   'LIMIT MAX(0, (SELECT COUNT(*) FROM mapping) - ?))', (self._maxsize,))
+            self._conn.commit()
+
+    def invalidate(self, title: str = None, tmdb_id: Optional[int] = None) -> int:
+        """
+        清除某个标题或某个 tmdb id 相关的所有记录（按标题清除时连同其 tmdb 条目的季度信息），
+        都不指定时清空全部，返回清除的条数
+        """
+        with self._lock:
+            if title is None and tmdb_id is None:
+                cursor = self._conn.execute('DELETE FROM mapping')
+            else:
+                tmdb_ids = {tmdb_id} if tmdb_id is not None else set()
+                if title is not None:
+                    tmdb_ids.update(row[0] for row in self._conn.execute(
+                        'SELECT DISTINCT tmdb_id FROM mapping WHERE title = ? AND tmdb_id IS NOT NULL', (title,)))
+                placeholders = ','.join('?' * len(tmdb_ids))
+                cursor = self._conn.execute(f'DELETE FROM mapping WHERE title = ? OR tmdb_id IN ({placeholders})',
+                                            (title, *tmdb_ids))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM mapping').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
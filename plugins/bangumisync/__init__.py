@@ -7,8 +7,10 @@ from app.plugins import _PluginBase
 from app.schemas import WebhookEventInfo, MediaInfo
 from app.schemas.types import EventType, MediaType
 from app.utils.http import RequestUtils
+from app.plugins.bangumisync.MappingCache import MappingCache
 from cachetools import cached, TTLCache
 import requests
+import os
 import re
 import datetime
 
@@ -20,7 +22,7 @@ class BangumiSync(_PluginBase):
     # 插件图标
     plugin_icon = "https://raw.githubusercontent.com/honue/MoviePilot-Plugins/main/icons/bangumi.jpg"
     # 插件版本
-    plugin_version = "1.9.0"
+    plugin_version = "1.10.0"
     # 插件作者
     plugin_author = "honue,happyTonakai,GlowsSama"
     # 作者主页
@@ -41,8 +43,21 @@ class BangumiSync(_PluginBase):
     _tmdb_key = None
     _request = None
     _uniqueid_match = False
+    # 持久化的映射缓存
+    _cache = None
+    _cache_size = 2000
+    _tmdb_ttl = 30 * 86400 # 标题 -> tmdb 条目
+    _season_ttl = 7 * 86400 # tmdb 季度的剧集列表，找不到当前集时会提前刷新
+    _subject_ttl = 90 * 86400 # 标题/季/tmdb id/首播日期 -> bgm 条目
+    _negative_ttl = 3600 # 查询不到结果时的缓存时间
 
     def init_plugin(self, config: dict = None):
+        self.stop_service()
+        try:
+            self._cache = MappingCache(os.path.join(self.get_data_path(), 'mapping.db'), maxsize=self._cache_size)
+        except Exception as e:
+            logger.warning(f"打开映射缓存失败，本次不使用缓存: {e}")
+            self._cache = None
         if config:
             self._enable = config.get('enable')
             self._uniqueid_match = config.get('uniqueid_match')
@@ -112,7 +127,24 @@ class BangumiSync(_PluginBase):
         except Exception as e:
             logger.warning(f"同步在看状态失败: {e}")
 
-    @cached(TTLCache(maxsize=100, ttl=3600))
+    def __cache_get(self, namespace: str, key: Tuple) -> Tuple[bool, Any]:
+        if not self._cache:
+            return False, None
+        try:
+            return self._cache.get(namespace, key)
+        except Exception as e:
+            logger.debug(f"读取映射缓存失败: {e}")
+            return False, None
+
+    def __cache_set(self, namespace: str, key: Tuple, value: Any, ttl: float,
+                    title: str = None, tmdb_id: int | None = None):
+        if not self._cache:
+            return
+        try:
+            self._cache.set(namespace, key, value, ttl, title=title, tmdb_id=tmdb_id)
+        except Exception as e:
+            logger.debug(f"写入映射缓存失败: {e}")
+
     def get_subjectid_by_title(self, title: str, season: int, episode: int, unique_id: int | None) -> Tuple:
         """
         获取 subject id
@@ -121,9 +153,9 @@ class BangumiSync(_PluginBase):
         :param episode: 集号
         :param unique_id: 集唯一 id
         """
-        logger.debug(f"{self._prefix}: 尝试使用 bgm api 来获取 subject id...")
         tmdb_id, original_name, original_language = self.get_tmdb_id(title)
         original_episode_name = None
+        start_date = None
         post_json = {
             "keyword": title,
             "sort": "match",
@@ -140,6 +172,14 @@ class BangumiSync(_PluginBase):
                     "filter": {"type": [2], "air_date": [f">={start_date}", f"<={end_date}"]},
                 }
 
+        # 同一部分（季度或分割放送的半季）的各集首播日期相同，对应同一个 bgm 条目
+        cache_key = (title, season, tmdb_id, start_date)
+        hit, subject = self.__cache_get('subject', cache_key)
+        if hit:
+            logger.debug(f"{self._prefix}: 使用缓存的 bgm 条目 {subject}")
+            return subject[0], subject[1], original_episode_name
+
+        logger.debug(f"{self._prefix}: 尝试使用 bgm api 来获取 subject id...")
         url = f"https://api.bgm.tv/v0/search/subjects"
         resp = self._request.post(url, json=post_json).json()
         if resp.get("title") == "Unauthorized":
@@ -153,23 +193,29 @@ class BangumiSync(_PluginBase):
         name_cn = data["name_cn"] or data["name"]
         name_cn = f"{name_cn} ({year})"
         subject_id = data["id"]
+        self.__cache_set('subject', cache_key, [subject_id, name_cn], self._subject_ttl, title=title, tmdb_id=tmdb_id)
         return subject_id, name_cn, original_episode_name
 
-    @cached(TTLCache(maxsize=100, ttl=3600))
     def get_tmdb_id(self, title: str):
+        hit, value = self.__cache_get('tmdb', (title,))
+        if hit:
+            return tuple(value)
         logger.debug(f"{self._prefix}: 尝试使用 tmdb api 来获取 subject id...")
         url = f"https://api.tmdb.org/3/search/tv?query={title}&api_key={self._tmdb_key}"
         ret = requests.get(url, proxies=settings.PROXY).json()
+        result = None, None, None
         if ret.get("total_results"):
-            results = ret.get("results")
+            for item in ret.get("results"):
+                if 16 in item.get("genre_ids"):
+                    result = item.get("id"), item.get("original_name"), item.get("original_language")
+                    break
         else:
             logger.warning(f"{self._prefix}: 未找到 {title} 的 tmdb 条目")
-            return None, None
-        for result in results:
-            if 16 in result.get("genre_ids"):
-                return result.get("id"), result.get("original_name"), result.get("original_language")
+        self.__cache_set('tmdb', (title,), list(result),
+                         self._tmdb_ttl if result[0] is not None else self._negative_ttl,
+                         title=title, tmdb_id=result[0])
+        return result
 
-    @cached(TTLCache(maxsize=100, ttl=3600))
     def get_airdate_and_ep_name(self, tmdbid: int, season_id: int, episode: int, unique_id: int | None, original_language: str):
         """
         通过tmdb 获取 airdate 定位季
@@ -206,8 +252,48 @@ class BangumiSync(_PluginBase):
             logger.debug(f"{self._prefix}: 无法通过episode group获取TMDB季度信息")
             return None  # Return None if no season detail is found
 
-        logger.debug(f"{self._prefix}: 尝试使用 tmdb api 来获取 airdate...")
-        resp = get_tv_season_detail(tmdbid, season_id)
+        def get_cached_season_detail(refresh: bool = False) -> Tuple[dict | None, bool]:
+            """
+            优先使用缓存的季度信息，只保留定位剧集用到的字段；返回 (季度信息, 是否来自缓存)
+            """
+            cache_key = (tmdbid, season_id, original_language)
+            if not refresh:
+                hit, detail = self.__cache_get('season', cache_key)
+                if hit:
+                    return detail, True
+            logger.debug(f"{self._prefix}: 尝试使用 tmdb api 来获取 airdate...")
+            detail = get_tv_season_detail(tmdbid, season_id)
+            if detail and detail.get("episodes"):
+                detail = {
+                    "air_date": detail.get("air_date"),
+                    "episodes": [{key: ep[key] for key in
+                                  ("id", "order", "episode_number", "episode_type", "air_date", "name") if key in ep}
+                                 for ep in detail["episodes"]]
+                }
+                self.__cache_set('season', cache_key, detail, self._season_ttl, tmdb_id=tmdbid)
+            return detail, False
+
+        def find_episode(detail: dict) -> Tuple[str | None, dict, bool]:
+            """
+            返回 (所在部分的首播日期, 剧集, 是否找到当前集)
+            """
+            # 初始化播出日期
+            air_date = detail.get("air_date")
+            for ep in detail["episodes"]:
+                if air_date is None:
+                    air_date = ep.get("air_date")
+                if self._uniqueid_match and unique_id:
+                    if ep.get("id") == unique_id:
+                        return air_date, ep, True
+                elif ep.get("order", -99) + 1 == episode:
+                    return air_date, ep, True
+                elif ep.get("episode_number") == episode:
+                    return air_date, ep, True
+                if ep.get("episode_type") in ["finale", "mid_season"]:
+                    air_date = None
+            return air_date, ep, False
+
+        resp, from_cache = get_cached_season_detail()
         # 处理无效的响应数据
         if not resp or "episodes" not in resp:
             logger.warning(f"{self._prefix}: 无法获取TMDB季度信息")
@@ -217,20 +303,12 @@ class BangumiSync(_PluginBase):
             logger.warning(f"{self._prefix}: 该季度没有剧集信息")
             return None, None, None
 
-        # 初始化播出日期
-        air_date = resp.get("air_date")
-        for ep in episodes:
-            if air_date is None:
-                air_date = ep.get("air_date")
-            if self._uniqueid_match and unique_id:
-                if ep.get("id") == unique_id:
-                    break
-            elif ep.get("order", -99) + 1 == episode:
-                break
-            elif ep.get("episode_number") == episode:
-                break
-            if ep.get("episode_type") in ["finale", "mid_season"]:
-                air_date = None
+        air_date, ep, found = find_episode(resp)
+        if not found and from_cache:
+            # 缓存中还没有这一集（新播出），重新获取季度信息
+            resp, _ = get_cached_season_detail(refresh=True)
+            if resp and resp.get("episodes"):
+                air_date, ep, found = find_episode(resp)
 
         if not air_date:
             logger.warning(f"{self._prefix}: 未找到匹配的TMDB剧集或播出日期")
@@ -383,7 +461,24 @@ class BangumiSync(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/cache/invalidate",
+                "endpoint": self.api_invalidate_cache,
+                "methods": ["GET"],
+                "summary": "清除映射缓存",
+                "description": "按标题或 tmdb id 清除缓存的 tmdb/bgm 映射，下次播放时重新查询；都不指定时清空全部"
+            }
+        ]
+
+    def api_invalidate_cache(self, apikey: str, title: str = None, tmdb_id: int = None) -> Dict[str, Any]:
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        if not self._cache:
+            return {"success": False, "message": "映射缓存不可用"}
+        removed = self._cache.invalidate(title=title or None, tmdb_id=tmdb_id)
+        logger.info(f"已清除 {title or tmdb_id or '全部'} 的映射缓存 {removed} 条")
+        return {"success": True, "data": {"removed": removed}}
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -516,7 +611,9 @@ class BangumiSync(_PluginBase):
         return self._enable
 
     def stop_service(self):
-        pass
+        if self._cache:
+            self._cache.close()
+            self._cache = None
 
 
 if __name__ == "__main__":